@@ -0,0 +1,40 @@
+# SPDX-License-Identifier: BSD-3-Clause
+
+import argparse
+import csv
+import glob
+import importlib
+
+import lunarlander
+from lunarlander.batch import summarize
+
+parser = argparse.ArgumentParser(description="Play many headless games in parallel")
+parser.add_argument("--ngames", type=int, default=100, help="Number of games")
+parser.add_argument("--first-seed", type=int, default=0, help="Seed of first game")
+parser.add_argument("--processes", type=int, default=None, help="Worker processes")
+parser.add_argument("--output", default=None, help="Save per-game results to CSV")
+args = parser.parse_args()
+
+bots = []
+for repo in glob.glob("*_bot"):
+    module = importlib.import_module(f"{repo}")
+    bots.append(module.Bot())
+
+results = lunarlander.run_batch(
+    bots=bots,  # List of bots to use
+    seeds=range(args.first_seed, args.first_seed + args.ngames),  # One game per seed
+    processes=args.processes,  # Defaults to the number of CPUs
+    crater_scaling=1.0,  # Artificially increase the size of craters
+    player_collisions=True,  # Set to False to disable collisions between players
+    asteroid_collisions=True,  # Set to False to disable being destroyed by asteroids
+)
+
+if args.output is not None:
+    with open(args.output, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(results.dtype.names)
+        writer.writerows(results.tolist())
+
+print(f"\nResults over {args.ngames} games:")
+for team, stats in summarize(results).items():
+    print(f"{team}: " + ", ".join(f"{k}={v:.2f}" for k, v in stats.items()))
@@ -0,0 +1,47 @@
+# SPDX-License-Identifier: BSD-3-Clause
+
+import argparse
+import json
+
+from lunarlander.benchmark import (
+    ASTEROIDS,
+    PLAYERS,
+    compare,
+    report,
+    run_benchmarks,
+)
+
+parser = argparse.ArgumentParser(description="Time the hot paths of the game engine")
+parser.add_argument(
+    "--players", type=int, nargs="+", default=PLAYERS, help="Numbers of players"
+)
+parser.add_argument(
+    "--asteroids", type=int, nargs="+", default=ASTEROIDS, help="Numbers of asteroids"
+)
+parser.add_argument(
+    "--min-time", type=float, default=0.5, help="Time spent on each benchmark (s)"
+)
+parser.add_argument("--ticks", type=int, default=300, help="Number of game ticks")
+parser.add_argument("--output", default=None, help="Save the results to JSON")
+parser.add_argument("--compare", default=None, help="JSON results to compare with")
+args = parser.parse_args()
+
+results = run_benchmarks(
+    players=args.players,
+    asteroids=args.asteroids,
+    min_time=args.min_time,
+    ticks=args.ticks,
+)
+
+print()
+print(report(results))
+
+if args.output is not None:
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=1)
+
+if args.compare is not None:
+    with open(args.compare) as f:
+        baseline = json.load(f)
+    print(f"\nCompared with {baseline['commit']} ({baseline['date']}):")
+    print(compare(baseline, results))
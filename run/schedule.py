@@ -0,0 +1,53 @@
+# SPDX-License-Identifier: BSD-3-Clause
+
+import argparse
+import glob
+import importlib
+
+from lunarlander.tournament import Tournament
+
+parser = argparse.ArgumentParser(
+    description="Play a tournament of headless games, which can be resumed"
+)
+parser.add_argument(
+    "--format", choices=["round-robin", "bracket"], default="round-robin"
+)
+parser.add_argument("--heat-size", type=int, default=8, help="Teams per game")
+parser.add_argument("--nseeds", type=int, default=3, help="Games per heat")
+parser.add_argument("--first-seed", type=int, default=0, help="Seed of first game")
+parser.add_argument("--rounds", type=int, default=1, help="Round-robin draws")
+parser.add_argument("--advance", type=int, default=2, help="Teams going through")
+parser.add_argument("--processes", type=int, default=None, help="Worker processes")
+parser.add_argument(
+    "--database", default="tournament.db", help="Results (delete to start over)"
+)
+args = parser.parse_args()
+
+bots = []
+for repo in glob.glob("*_bot"):
+    module = importlib.import_module(f"{repo}")
+    bots.append(module.Bot())
+
+tournament = Tournament(
+    bots=bots,  # List of bots to use
+    store=args.database,  # Games already in the database are not played again
+    processes=args.processes,  # Defaults to the number of CPUs
+    safe=True,  # A bot raising an error does not stop the tournament
+    crater_scaling=1.0,  # Artificially increase the size of craters
+    player_collisions=True,  # Set to False to disable collisions between players
+    asteroid_collisions=True,  # Set to False to disable being destroyed by asteroids
+)
+
+seeds = range(args.first_seed, args.first_seed + args.nseeds)
+if args.format == "round-robin":
+    ranking = tournament.play_round_robin(
+        heat_size=args.heat_size, seeds=seeds, rounds=args.rounds
+    )
+else:
+    ranking = tournament.play_bracket(
+        heat_size=args.heat_size, seeds=seeds, advance=args.advance
+    )
+
+print("\nRanking:")
+for i, (team, score) in enumerate(ranking):
+    print(f"{i + 1}. {team}: {score}")
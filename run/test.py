@@ -16,7 +16,17 @@ lunarlander.play(
     crater_scaling=1.0,  # Artificially increase the size of craters
     player_collisions=True,  # Set to False to disable collisions between players
     asteroid_collisions=True,  # Set to False to disable being destroyed by asteroids
-    speedup=1.0,  # Increase to speed up the game (no guarantees this works very well)
+    speedup=1.0,  # Increase to speed up the game (this does not change the outcome)
+    substeps=1,  # Number of simulation steps per frame (at normal speed)
     fullscreen=False,  # Set to True to play in fullscreen mode
+    headless=False,  # Set to True to run without a window, as fast as possible
+    bot_workers=0,  # Number of processes to run the bots in (0: run in the game)
+    bot_time_budget=None,  # Time allowed per bot and per tick, in seconds
+    report_latency=False,  # Set to True to print the time taken by the bots
+    record=None,  # Set to a file name to record the game, see lunarlander.replay()
+    video=None,  # Set to a directory (PNG frames) or video file to save the game
+    video_every=1,  # Only save every n-th frame to the video
+    profile=False,  # Set to True to print the time taken by each part of a frame
+    trace=None,  # Set to a file name to save the frame profile as a Chrome trace
     test=True,  # Set to True to run in test mode
 )
@@ -2,14 +2,49 @@
 
 # flake8: noqa
 
+from typing import Optional
+
 from .config import Config
 
 config = Config()
 
+from .batch import run_batch
 from .engine import Engine
+from .env import VectorEnv
+from .recording import Replay
 from .tools import Instructions
 
 
 def play(*args, **kwargs):
     eng = Engine(*args, **kwargs)
+    eng.run()
+    return eng
+
+
+def replay(
+    filename: str,
+    headless: bool = False,
+    fullscreen: bool = False,
+    video: Optional[str] = None,
+    video_every: int = 1,
+):
+    """
+    Replay a game recorded with ``play(..., record=filename)``. No bot code is run:
+    the thruster commands are read from the file. In headless mode, the game is
+    replayed as fast as possible. The game can be saved to a ``video`` (see
+    :class:`Engine`), e.g. to make videos of games on machines without a display.
+    """
+    rep = Replay(filename)
+    eng = Engine(
+        bots=rep.make_bots(),
+        seed=rep.seed,
+        headless=headless,
+        fullscreen=fullscreen,
+        write_scores=False,
+        replay=rep,
+        video=video,
+        video_every=video_every,
+        **rep.options,
+    )
+    eng.run()
     return eng
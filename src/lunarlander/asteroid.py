@@ -1,82 +1,129 @@
 # SPDX-License-Identifier: BSD-3-Clause
 
+from __future__ import annotations
+
 import uuid
-from typing import Tuple
+from typing import TYPE_CHECKING, List, Optional
 
 import numpy as np
-import pyglet
 
 from . import config
-from .tools import recenter_image
+from .images import TextureCache
+
+if TYPE_CHECKING:
+    import pyglet
+
 
+class AsteroidPool:
+    """
+    Store for all the asteroids in the game. Positions, directions, speeds and sizes
+    are held in preallocated arrays, of which the first ``len(self)`` rows are in
+    use. Despawned asteroids are removed by compacting the arrays in place, and the
+    arrays are only reallocated when the pool is full.
+    """
 
-class Asteroid:
     def __init__(
         self,
-        x: float,
-        y: float,
-        v: float,
-        heading: float,
-        size: float,
-        batch: pyglet.graphics.Batch,
+        capacity: int = 16,
+        batch: Optional[pyglet.graphics.Batch] = None,
+        textures: Optional[TextureCache] = None,
     ):
-        self.id = uuid.uuid4().hex
-        self.v = v
-        self.size = int(size)
-        self.heading = heading
-        self.make_avatar(x, y, batch)
-
-    def make_avatar(self, x: float, y: float, batch: pyglet.graphics.Batch):
-        img = pyglet.image.load(config.resources / "asteroid.png")
-        self.avatar = pyglet.sprite.Sprite(
-            img=recenter_image(img),
-            x=x,
-            y=y,
-            batch=batch,
-        )
-        self.avatar.width = self.size
-        self.avatar.height = self.size
-        self.avatar.rotation = -self.heading
+        self.batch = batch
+        self._textures = textures
+        self.n = 0
+        self.ids: List[str] = []
+        self.sprites: list = []
+        self._allocate(capacity)
 
-    @property
-    def x(self) -> float:
-        return self.avatar.x
+    def _allocate(self, capacity: int):
+        self.position = np.zeros((capacity, 2))
+        self.direction = np.zeros((capacity, 2))
+        self.heading = np.zeros(capacity)
+        self.speed = np.zeros(capacity)
+        self.size = np.zeros(capacity, dtype=int)
+
+    def _grow(self):
+        old = self._arrays()
+        self._allocate(2 * self.capacity)
+        for name, array in old.items():
+            getattr(self, name)[: self.n] = array[: self.n]
+
+    def _arrays(self) -> dict:
+        return {
+            "position": self.position,
+            "direction": self.direction,
+            "heading": self.heading,
+            "speed": self.speed,
+            "size": self.size,
+        }
 
-    @x.setter
-    def x(self, value: float):
-        self.avatar.x = value
+    def __len__(self) -> int:
+        return self.n
 
     @property
-    def y(self) -> float:
-        return self.avatar.y
+    def capacity(self) -> int:
+        return len(self.heading)
 
-    @y.setter
-    def y(self, value: float):
-        self.avatar.y = value
+    def spawn(self, x: float, y: float, v: float, heading: float, size: float):
+        if self.n == self.capacity:
+            self._grow()
+        i = self.n
+        h = np.radians(heading)
+        self.position[i] = x, y
+        self.direction[i] = np.cos(h), np.sin(h)
+        self.heading[i] = heading
+        self.speed[i] = v
+        self.size[i] = int(size)
+        self.ids.append(uuid.uuid4().hex)
+        if self.batch is not None:
+            self.sprites.append(self.make_avatar(i))
+        self.n += 1
 
-    def velocity_vector(self) -> Tuple[float, float]:
-        return (
-            self.v * np.cos(np.radians(self.heading)),
-            self.v * np.sin(np.radians(self.heading)),
+    def make_avatar(self, i: int) -> pyglet.sprite.Sprite:
+        import pyglet
+
+        avatar = pyglet.sprite.Sprite(
+            img=self._textures["asteroid"],
+            x=self.position[i, 0],
+            y=self.position[i, 1],
+            batch=self.batch,
         )
+        avatar.width = self.size[i]
+        avatar.height = self.size[i]
+        avatar.rotation = -self.heading[i]
+        return avatar
+
+    def velocity(self) -> np.ndarray:
+        return self.speed[: self.n, None] * self.direction[: self.n]
 
     def move(self, dt: float):
-        vx, vy = self.velocity_vector()
-        self.x += vx * dt
-        self.y += vy * dt
-        self.x = self.x % config.nx
-
-    def tip(self) -> Tuple[float, float]:
-        tipx = self.x + self.size * np.cos(np.radians(self.heading)) / 2
-        tipy = self.y + self.size * np.sin(np.radians(self.heading)) / 2
-        return tipx % config.nx, tipy
-
-    def to_dict(self) -> dict:
-        x, y = self.tip()
-        return {
-            "id": self.id,
-            "position": (x, y),
-            "velocity": self.velocity_vector(),
-            "heading": self.heading,
-            "size": self.size * config.asteroid_tip_size,
-        }
+        position = self.position[: self.n]
+        position += self.velocity() * dt
+        position[:, 0] %= config.nx
+        for sprite, (x, y) in zip(self.sprites, position):
+            sprite.x = x
+            sprite.y = y
+
+    def tips(self) -> np.ndarray:
+        tips = self.position[: self.n] + 0.5 * (
+            self.size[: self.n, None] * self.direction[: self.n]
+        )
+        tips[:, 0] %= config.nx
+        return tips
+
+    def tip_sizes(self) -> np.ndarray:
+        return self.size[: self.n] * config.asteroid_tip_size
+
+    def remove(self, mask: np.ndarray):
+        """
+        Remove the asteroids selected by ``mask``, preserving the order of the rest.
+        """
+        keep = ~mask
+        m = int(keep.sum())
+        for array in self._arrays().values():
+            array[:m] = array[: self.n][keep]
+        for sprite in (s for s, k in zip(self.sprites, keep) if not k):
+            sprite.delete()
+        self.ids = [a for a, k in zip(self.ids, keep) if k]
+        self.sprites = [s for s, k in zip(self.sprites, keep) if k]
+        self.n = m
@@ -0,0 +1,132 @@
+# SPDX-License-Identifier: BSD-3-Clause
+
+import contextlib
+import copy
+import io
+import os
+import sys
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from .engine import Engine
+
+RESULT_DTYPE = np.dtype(
+    [
+        ("seed", np.int64),
+        ("team", "U64"),
+        ("score", np.int64),
+        ("landed", bool),
+        ("crashed", bool),
+        ("crash_reason", "U128"),
+        ("landing_time", np.float64),
+        ("fuel", np.float64),
+    ]
+)
+
+
+def play_game(bots: list, seed: int, quiet: bool = True, **kwargs) -> np.ndarray:
+    """
+    Play a single headless game and return one result row per player.
+
+    Parameters
+    ----------
+    bots:
+        The bots taking part in the game.
+    seed:
+        The seed for the game. The same bots and seed always give the same results.
+    quiet:
+        Silence the messages printed by the engine and the bots during the game.
+    **kwargs:
+        Additional game options passed on to the :class:`Engine`.
+    """
+    stdout = io.StringIO() if quiet else sys.stdout
+    with contextlib.redirect_stdout(stdout):
+        engine = Engine(
+            bots=bots, seed=seed, headless=True, write_scores=False, **kwargs
+        )
+        engine.run()
+    rows = [
+        (
+            seed,
+            team,
+            p.score,
+            p.landed,
+            p.dead,
+            p.crash_reason or "",
+            np.nan if p.landing_time is None else p.landing_time,
+            p.fuel,
+        )
+        for team, p in engine.players.items()
+    ]
+    return np.array(rows, dtype=RESULT_DTYPE)
+
+
+def _play_game(args: tuple) -> np.ndarray:
+    bots, seed, quiet, kwargs = args
+    return play_game(copy.deepcopy(bots), seed, quiet=quiet, **kwargs)
+
+
+def run_batch(
+    bots: list,
+    seeds: Sequence[int],
+    processes: Optional[int] = None,
+    quiet: bool = True,
+    **kwargs,
+) -> np.ndarray:
+    """
+    Play one headless game per seed, in parallel over a pool of processes, and
+    return the results as a structured array with one row per player and game
+    (see ``RESULT_DTYPE`` for the columns).
+
+    Every game starts from a fresh copy of the bots, so that games do not depend on
+    each other or on the order in which they are run, and the results of each game
+    can be reproduced from its seed.
+
+    Parameters
+    ----------
+    bots:
+        The bots taking part in each game. They must be picklable.
+    seeds:
+        The seeds of the games to play.
+    processes:
+        The number of worker processes. Defaults to the number of CPUs.
+    quiet:
+        Silence the messages printed by the engine and the bots during the games.
+    **kwargs:
+        Additional game options passed on to the :class:`Engine`.
+    """
+    if processes is None:
+        processes = os.cpu_count()
+    tasks = [(bots, seed, quiet, kwargs) for seed in seeds]
+    if processes == 1:
+        results: List[np.ndarray] = list(map(_play_game, tasks))
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            results = list(pool.map(_play_game, tasks))
+    if not results:
+        return np.zeros(0, dtype=RESULT_DTYPE)
+    return np.concatenate(results)
+
+
+def summarize(results: np.ndarray) -> dict:
+    """
+    Aggregate batch results per team: number of games, mean score, landing rate,
+    mean landing time and mean fuel left.
+    """
+    summary = {}
+    for team in dict.fromkeys(results["team"]):
+        sel = results[results["team"] == team]
+        landed = sel[sel["landed"]]
+        summary[team] = {
+            "games": len(sel),
+            "mean score": sel["score"].mean(),
+            "landing rate": sel["landed"].mean(),
+            "mean landing time": (
+                landed["landing_time"].mean() if len(landed) else np.nan
+            ),
+            "mean fuel": sel["fuel"].mean(),
+        }
+    return summary
@@ -0,0 +1,284 @@
+# SPDX-License-Identifier: BSD-3-Clause
+
+import contextlib
+import datetime
+import io
+import platform
+import subprocess
+import time
+import tracemalloc
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, List, Optional, Sequence
+
+import numpy as np
+
+from . import config
+from .engine import Engine
+from .terrain import Terrain
+from .tools import Instructions
+
+PLAYERS = (2, 10, 50, 200, 500)
+ASTEROIDS = (0, 10, 50, 200)
+
+
+class HoverBot:
+    """
+    Simple bot that keeps its lander in the air, so that all the players stay in
+    the game for the whole benchmark.
+    """
+
+    def __init__(self, team: str):
+        self.team = team
+
+    def run(self, t, dt, terrain, players, asteroids):
+        me = players[self.team]
+        instructions = Instructions()
+        instructions.main = me.velocity[1] < 0
+        if me.heading < -1:
+            instructions.left = True
+        elif me.heading > 1:
+            instructions.right = True
+        return instructions
+
+
+def _time(func: Callable[[], Any], min_time: float) -> dict:
+    """
+    Call ``func`` repeatedly for at least ``min_time`` seconds (and at least 3
+    times), and return statistics of the time per call, in seconds.
+    """
+    times = []
+    end = time.perf_counter() + min_time
+    while (len(times) < 3) or (time.perf_counter() < end):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return {
+        "calls": len(times),
+        "median": float(np.median(times)),
+        "min": float(np.min(times)),
+        "mean": float(np.mean(times)),
+    }
+
+
+def make_engine(players: int, asteroids: int, seed: int = 0) -> Engine:
+    """
+    Make a headless game with ``players`` landers and ``asteroids`` asteroids, spread
+    above the screen.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        engine = Engine(
+            bots=[HoverBot(f"bot{i}") for i in range(players)],
+            seed=seed,
+            headless=True,
+            write_scores=False,
+        )
+    rng = np.random.RandomState(seed)
+    for _ in range(asteroids):
+        engine.asteroids.spawn(
+            x=rng.uniform(0, config.nx),
+            y=rng.uniform(config.ny + 100, config.ny + 2000),
+            v=rng.uniform(100, 200),
+            heading=rng.uniform(-25, -155),
+            size=72,
+        )
+    return engine
+
+
+def benchmark_terrain(min_time: float = 0.5, seed: int = 0) -> List[dict]:
+    """
+    Time the making of the terrain, the craters and the updates of the landing
+    sites, without and with the background image (which is made when the game is
+    drawn, in a window or to a video). The craters with a background update the
+    tiles of the background in view.
+    """
+    rng = np.random.RandomState(seed)
+    results = [
+        {
+            "name": "Terrain()",
+            **_time(lambda: Terrain(rng=rng, background=False), min_time),
+        }
+    ]
+
+    width = 2 * config.crater_radius
+
+    def make_crater(terrain: Terrain):
+        terrain.make_crater(x=rng.randint(config.nx))
+
+    def update_landing_sites(terrain: Terrain):
+        x = rng.randint(config.nx - width)
+        terrain.update_landing_sites(x, x + width)
+
+    terrain = Terrain(rng=rng, background=False)
+    results += [
+        {"name": "make_crater", **_time(partial(make_crater, terrain), min_time)},
+        {
+            "name": "update_landing_sites",
+            **_time(partial(update_landing_sites, terrain), min_time),
+        },
+    ]
+
+    with_background = Terrain(rng=rng, background=True)
+    background = with_background.background
+    # The craters update the tiles in memory
+    for i in range(min(background.capacity, background.ntiles)):
+        background.tile(i)
+
+    def make_tile():
+        background._tiles.pop(0, None)
+        background.tile(0)
+
+    results += [
+        {"name": "Background.tile", **_time(make_tile, min_time)},
+        {
+            "name": "make_crater (background)",
+            **_time(partial(make_crater, with_background), min_time),
+        },
+    ]
+    return results
+
+
+def benchmark_scenario(
+    players: int,
+    asteroids: int,
+    min_time: float = 0.5,
+    ticks: int = 300,
+    seed: int = 0,
+) -> List[dict]:
+    """
+    Time the parts of a game tick, and whole ticks, for one number of players and
+    asteroids. The asteroids do not move while the parts are timed, so that their
+    number stays the same (the craters are timed in :func:`benchmark_terrain`).
+    """
+    engine = make_engine(players=players, asteroids=asteroids, seed=seed)
+    dt = engine.step_dt
+    parts = {
+        "compute_collisions": engine.compute_collisions,
+        "check_landing": lambda: engine.check_landing(t=0.0),
+        "update_asteroids": lambda: engine.update_asteroids(t=0.0, dt=0.0),
+        "generate_info": lambda: engine.generate_info(t=0.0, dt=dt),
+    }
+    results = [{"name": name, **_time(func, min_time)} for name, func in parts.items()]
+
+    # Whole ticks, including the bots, from the start of a new game
+    engine = make_engine(players=players, asteroids=asteroids, seed=seed)
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for _ in range(ticks):
+            engine.step()
+        elapsed = time.perf_counter() - start
+    tick = {
+        "name": "tick",
+        "calls": ticks,
+        "mean": elapsed / ticks,
+        "ticks_per_second": ticks / elapsed,
+    }
+
+    # Peak memory of making the game and playing a few ticks, measured separately
+    # as tracing the allocations slows everything down
+    tracemalloc.start()
+    try:
+        engine = make_engine(players=players, asteroids=asteroids, seed=seed)
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in range(min(ticks, config.fps)):
+                engine.step()
+        tick["peak_memory"] = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    results.append(tick)
+
+    for result in results:
+        result.update(players=players, asteroids=asteroids)
+    return results
+
+
+def _commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=Path(__file__).parent,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(
+    players: Sequence[int] = PLAYERS,
+    asteroids: Sequence[int] = ASTEROIDS,
+    min_time: float = 0.5,
+    ticks: int = 300,
+    seed: int = 0,
+    verbose: bool = True,
+) -> dict:
+    """
+    Run the terrain benchmarks, and the tick benchmarks for every combination of
+    the numbers of players and asteroids. Times are in seconds per call, and
+    memory in bytes.
+
+    The returned dict can be saved as JSON, and compared with the results from
+    another commit with :func:`compare`.
+    """
+    results = benchmark_terrain(min_time=min_time, seed=seed)
+    for p in players:
+        for a in asteroids:
+            if verbose:
+                print(f"Benchmarking {p} players and {a} asteroids")
+            results += benchmark_scenario(
+                players=p, asteroids=a, min_time=min_time, ticks=ticks, seed=seed
+            )
+    return {
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.platform(),
+        "results": results,
+    }
+
+
+def _key(result: dict) -> tuple:
+    return (result["name"], result.get("players"), result.get("asteroids"))
+
+
+def _label(result: dict) -> str:
+    if "players" not in result:
+        return result["name"]
+    return f"{result['name']} [{result['players']}p, {result['asteroids']}a]"
+
+
+def report(benchmarks: dict) -> str:
+    """
+    Format benchmark results as a table, with times in milliseconds.
+    """
+    rows = [(_label(r), r) for r in benchmarks["results"]]
+    width = max([len(label) for label, _ in rows] + [9])
+    lines = [f"{'Benchmark':<{width}}  {'ms/call':>9}  {'ticks/s':>8}  {'peak MB':>8}"]
+    for label, r in rows:
+        ms = r.get("median", r["mean"]) * 1e3
+        tps = f"{r['ticks_per_second']:.1f}" if "ticks_per_second" in r else ""
+        mem = f"{r['peak_memory'] / 1e6:.1f}" if "peak_memory" in r else ""
+        lines.append(f"{label:<{width}}  {ms:>9.3f}  {tps:>8}  {mem:>8}")
+    return "\n".join(lines)
+
+
+def compare(baseline: dict, benchmarks: dict, threshold: float = 1.2) -> str:
+    """
+    Compare benchmark results with a baseline (e.g. from another commit). Times
+    that grew by more than ``threshold`` are marked as regressions.
+    """
+    old = {_key(r): r for r in baseline["results"]}
+    rows = [(_label(r), old.get(_key(r)), r) for r in benchmarks["results"]]
+    width = max([len(label) for label, _, _ in rows] + [9])
+    lines = [f"{'Benchmark':<{width}}  {'old ms':>9}  {'new ms':>9}  {'ratio':>6}"]
+    for label, before, after in rows:
+        if before is None:
+            continue
+        t0 = before.get("median", before["mean"]) * 1e3
+        t1 = after.get("median", after["mean"]) * 1e3
+        ratio = t1 / t0
+        flag = "  <- slower" if ratio > threshold else ""
+        lines.append(f"{label:<{width}}  {t0:>9.3f}  {t1:>9.3f}  {ratio:>6.2f}{flag}")
+    return "\n".join(lines)
@@ -0,0 +1,65 @@
+# SPDX-License-Identifier: BSD-3-Clause
+
+import hashlib
+import os
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+
+from . import config
+
+# Increase this when the contents of the cached arrays change, to invalidate them
+VERSION = 1
+
+
+@lru_cache(maxsize=None)
+def file_hash(path) -> str:
+    if isinstance(path, str):
+        path = Path(path)
+    return hashlib.sha1(path.read_bytes()).hexdigest()
+
+
+def make_key(*parts) -> str:
+    h = hashlib.sha1()
+    for part in parts:
+        if isinstance(part, np.ndarray):
+            h.update(part.dtype.str.encode("utf-8"))
+            h.update(np.ascontiguousarray(part).tobytes())
+        else:
+            h.update(repr(part).encode("utf-8"))
+    return h.hexdigest()
+
+
+def cached_array(kind: str, key: str, build: Callable[[], np.ndarray]) -> np.ndarray:
+    """
+    Load an array from the on-disk cache, as a read-only memory map. If it is not in
+    the cache, it is made with ``build()`` and saved for next time. The file is
+    written to a temporary name and then renamed, so that concurrent processes never
+    see a partially written array.
+
+    The cache lives in ``config.cache_dir``. Setting it to ``None`` disables the
+    cache.
+    """
+    if config.cache_dir is None:
+        return build()
+    path = config.cache_dir / f"v{VERSION}" / kind / f"{key}.npy"
+    try:
+        return np.load(path, mmap_mode="r")
+    except (OSError, ValueError):
+        pass
+    array = build()
+    tmp = None
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, array)
+        os.replace(tmp, path)
+    except OSError:
+        # The cache is not writable: carry on without it
+        if (tmp is not None) and os.path.exists(tmp):
+            os.remove(tmp)
+    return array
@@ -0,0 +1,80 @@
+# SPDX-License-Identifier: BSD-3-Clause
+
+from typing import Optional
+
+import numpy as np
+
+from . import config
+from .collisions import periodic_dx
+
+# Time (in seconds of game time) for the view to catch up with its target
+CAMERA_LAG = 0.5
+
+
+class Camera:
+    """
+    Horizontal position of the view over the world, when the world is wider than
+    the view. The view follows a single lander (e.g. the one played with the
+    keyboard) if ``follow`` is set. Otherwise, it follows the landers in view, and
+    moves to the largest group of active landers when that group is larger than
+    the one in view. The view glides to its target instead of jumping.
+
+    Parameters
+    ----------
+    width:
+        The width of the view. Defaults to ``config.view_nx``.
+    follow:
+        The number of the player to follow.
+    """
+
+    def __init__(self, width: Optional[int] = None, follow: Optional[int] = None):
+        self.width = config.view_nx if width is None else width
+        self.follow = follow
+        # Position of the left edge of the view in the world
+        self.x = 0.0
+        self._t = None
+
+    @property
+    def left(self) -> int:
+        """
+        The first column of the world in view.
+        """
+        return int(np.floor(self.x)) % config.nx
+
+    def target(self, position: np.ndarray, active: np.ndarray) -> Optional[float]:
+        """
+        The column on which to center the view, or ``None`` to stay in place.
+        """
+        if self.follow is not None:
+            return position[self.follow, 0]
+        x = np.sort(position[active, 0])
+        if len(x) == 0:
+            return None
+        nx = config.nx
+        in_view = x[(x - self.left) % nx < self.width]
+        # Number of landers in a view starting at each lander (wrapping around)
+        unwrapped = np.concatenate([x, x + nx])
+        count = np.searchsorted(unwrapped, x + self.width) - np.arange(len(x))
+        best = int(np.argmax(count))
+        if count[best] > len(in_view):
+            return 0.5 * (unwrapped[best] + unwrapped[best + count[best] - 1])
+        offset = (in_view - self.left) % nx
+        return self.left + 0.5 * (offset.min() + offset.max())
+
+    def update(self, t: float, position: np.ndarray, active: np.ndarray):
+        """
+        Move the view towards its target, at game time ``t``. The view jumps to the
+        target the first time.
+        """
+        if config.nx <= self.width:
+            self.x = 0.0
+            return
+        target = self.target(position, active)
+        dt = None if self._t is None else t - self._t
+        self._t = t
+        if target is None:
+            return
+        dx = periodic_dx(target - (self.x + 0.5 * self.width), config.nx)
+        if dt is not None:
+            dx *= min(max(dt, 0.0) / CAMERA_LAG, 1.0)
+        self.x = (self.x + dx) % config.nx
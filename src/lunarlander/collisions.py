@@ -0,0 +1,89 @@
+# SPDX-License-Identifier: BSD-3-Clause
+
+from functools import lru_cache
+from typing import Tuple
+
+import numpy as np
+
+
+def _ranges(start: np.ndarray, stop: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    For every ``k``, the pairs ``(k, m)`` with ``start[k] <= m < stop[k]``.
+    """
+    counts = np.maximum(stop - start, 0)
+    first = np.repeat(np.arange(len(counts)), counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return first, start[first] + offsets
+
+
+# Below this number of points, it is faster to compare all the pairs
+BRUTE_FORCE_SIZE = 32
+
+
+@lru_cache(maxsize=None)
+def _all_pairs(n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    All the pairs ``(i, j)`` with ``i > j``, sorted by ``i`` and then ``j``.
+    """
+    return np.tril_indices(n, k=-1)
+
+
+def periodic_dx(dx: np.ndarray, period: float) -> np.ndarray:
+    """
+    Shortest horizontal separation between points on a periodic x axis.
+    """
+    return dx - period * np.round(dx / period)
+
+
+def close_pairs(
+    position: np.ndarray, radius: float, period: float
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Find all the pairs of points that are closer than ``radius`` (but not on top of
+    each other), with a periodic x axis of length ``period``.
+
+    The points are sorted along x, and only the points less than ``radius`` apart
+    along x (including across the periodic boundary) are compared, so the cost
+    grows with the number of points times their density, instead of the square of
+    the number of points. Below ``BRUTE_FORCE_SIZE`` points, all the pairs are
+    compared instead.
+
+    Return the indices ``(i, j)`` of the pairs, with ``i > j``, sorted by ``i`` and
+    then ``j``.
+    """
+    n = len(position)
+    if n <= BRUTE_FORCE_SIZE:
+        i, j = _all_pairs(n)
+        close = _is_close(position, i, j, radius=radius, period=period)
+        return i[close], j[close]
+    x = position[:, 0] % period
+    order = np.argsort(x, kind="stable")
+    xs = x[order]
+    index = np.arange(n)
+    # Following points in the sorted order, up to a distance of radius along x
+    a, b = _ranges(index + 1, np.searchsorted(xs, xs + radius))
+    # Points near the right edge are also close to the points near the left edge
+    wa, wb = _ranges(
+        np.zeros(n, dtype=int),
+        np.minimum(np.searchsorted(xs, xs + radius - period), index),
+    )
+    i = order[np.concatenate([a, wa])]
+    j = order[np.concatenate([b, wb])]
+
+    close = _is_close(position, i, j, radius=radius, period=period)
+    i, j = np.maximum(i[close], j[close]), np.minimum(i[close], j[close])
+    sort = np.lexsort((j, i))
+    return i[sort], j[sort]
+
+
+def _is_close(
+    position: np.ndarray, i: np.ndarray, j: np.ndarray, radius: float, period: float
+) -> np.ndarray:
+    """
+    Whether the points of each pair are closer than ``radius``, but not on top of
+    each other.
+    """
+    dx = periodic_dx(position[i, 0] - position[j, 0], period)
+    dy = position[i, 1] - position[j, 1]
+    dist = np.sqrt(dx**2 + dy**2)
+    return (dist < radius) & (dist > 0)
@@ -1,22 +1,33 @@
 # SPDX-License-Identifier: BSD-3-Clause
 
-import importlib_resources as ir
+import os
+from functools import cached_property
+from pathlib import Path
+
 import numpy as np
-from matplotlib import font_manager
-from PIL import ImageFont
 
 
 class Config:
     def __init__(self):
         self.scoreboard_width = 200
         self.fps = 30
-        self.resources = ir.files("lunarlander") / "resources"
+        # Longest frame time the simulation catches up with, in seconds
+        self.max_frame_time = 0.25
+        # Preprocessed assets are cached here (set to None to disable the cache)
+        self.cache_dir = Path(
+            os.environ.get(
+                "LUNARLANDER_CACHE_DIR", Path.home() / ".cache" / "lunarlander"
+            )
+        )
         self.avatar_size = (25, 25)
-        file = font_manager.findfont("sans")
-        self.large_font = ImageFont.truetype(file, size=16)
-        self.medium_font = ImageFont.truetype(file, size=12)
-        self.nx = 1920 - self.scoreboard_width
+        # Size of the part of the window showing the game (next to the scoreboard)
+        self.view_nx = 1920 - self.scoreboard_width
+        # Size of the world, which can be wider than the view: the view then follows
+        # the landers. The world and the view have the same height.
+        self.nx = self.view_nx
         self.ny = 1080
+        # Width of the tiles in which the background of the terrain is drawn
+        self.tile_size = 256
         self.time_limit = 60 * 5
         self.gravity = np.array([0, -1.62])  # m/s^2
         self.thrust = np.abs(self.gravity[1]) * 3  # m/s^2
@@ -36,3 +47,36 @@ class Config:
         self.score_fuel_bonus = 5
         self.score_landing_site_bonus = 8
         self.score_landing_bonus = 5
+
+    # The resources and fonts are only looked up when they are first used, so that
+    # importing the package (e.g. to play headless games) stays fast
+
+    @cached_property
+    def resources(self):
+        import importlib_resources as ir
+
+        return ir.files("lunarlander") / "resources"
+
+    @cached_property
+    def font_file(self) -> str:
+        from matplotlib import font_manager
+
+        return font_manager.findfont("sans")
+
+    @cached_property
+    def font_name(self) -> str:
+        from matplotlib import font_manager
+
+        return font_manager.FontProperties(fname=self.font_file).get_name()
+
+    @cached_property
+    def large_font(self):
+        from PIL import ImageFont
+
+        return ImageFont.truetype(self.font_file, size=16)
+
+    @cached_property
+    def medium_font(self):
+        from PIL import ImageFont
+
+        return ImageFont.truetype(self.font_file, size=12)
@@ -1,22 +1,46 @@
 # SPDX-License-Identifier: BSD-3-Clause
 
 import time
-from typing import Optional
+from typing import Optional, Tuple
 
-import matplotlib.pyplot as plt
 import numpy as np
-import pyglet
 
 from . import config
-from .asteroid import Asteroid
-from .graphics import Graphics
-from .player import Player
+from .asteroid import AsteroidPool
+from .camera import Camera
+from .collisions import close_pairs, periodic_dx
+from .latency import LatencyHistogram, latency_report
+from .player import LanderState, Player
+from .profiler import Profiler
+from .recording import Replay, ReplayWriter
 from .scores import finalize_scores
+from .snapshot import Snapshot
 from .terrain import Terrain
-from .tools import AsteroidInfo, Instructions, PlayerInfo
+from .tools import Instructions
+
+
+def player_colors(nplayers: int) -> list:
+    """
+    Colors of the players, spread over a colormap.
+    """
+    from matplotlib import colormaps
+
+    cmap = colormaps["gist_ncar"]
+    return [cmap(i / nplayers) for i in range(1, nplayers + 1)]
+
+
+def move_landers(landers: LanderState, dt: float, index: Optional[np.ndarray] = None):
+    """
+    Move the landers of one or several games (e.g. in a :class:`VectorEnv`) over a
+    step of ``dt`` seconds of game time. The landers move at twice the speed of the
+    game time, as in the original game. See :meth:`LanderState.move` for ``index``.
+    """
+    landers.move(dt=dt * 2, index=index)
 
 
 def add_key_actions(window, player: Player):
+    import pyglet
+
     @window.event
     def on_key_press(symbol, modifiers):
         if symbol == pyglet.window.key.UP:
@@ -52,15 +76,45 @@ class Engine:
         player_collisions: bool = True,
         asteroid_collisions: bool = True,
         speedup: float = 1.0,
+        headless: bool = False,
+        write_scores: bool = True,
+        record: Optional[str] = None,
+        replay: Optional[Replay] = None,
+        bot_workers: int = 0,
+        bot_time_budget: Optional[float] = None,
+        report_latency: bool = False,
+        substeps: int = 1,
+        profile: bool = False,
+        trace: Optional[str] = None,
+        video: Optional[str] = None,
+        video_every: int = 1,
+        landers: Optional[LanderState] = None,
     ):
-        if seed is not None:
-            np.random.seed(seed)
+        # The game has its own random stream, so that the map, starting positions
+        # and asteroids only depend on the seed (and not on what the bots or the
+        # graphics draw from the global state). The global state is left alone.
+        if seed is None:
+            seed = int(np.random.SeedSequence().generate_state(1)[0])
+        self.seed = seed
+        self.rng = np.random.RandomState(seed)
 
+        if config.nx < config.view_nx:
+            raise ValueError("The world must be at least as wide as the view.")
+        # Replays from before the width of the world was recorded are 1720 wide
+        recorded_nx = config.nx if replay is None else replay.header.get("nx", 1720)
+        if recorded_nx != config.nx:
+            raise ValueError(
+                f"The game was recorded in a world of width {recorded_nx}: "
+                "set config.nx to replay it."
+            )
         self.nx = config.nx
         self.ny = config.ny
-        self.start_time = None
+        # The simulation advances in fixed steps, several per frame if needed
+        self.step_dt = 1.0 / (config.fps * substeps)
+        self.steps = 0
+        self.sim_time = 0.0
+        self._accumulator = 0.0
         self._test = test
-        self.asteroids = []
         self.safe = safe
         self.exiting = False
         self.time_of_last_scoreboard_update = 0
@@ -69,30 +123,70 @@ class Engine:
         self._player_collisions = player_collisions
         self._asteroid_collisions = asteroid_collisions
         self._speedup = speedup
+        self._write_scores = write_scores
+        # Timers for the parts of each frame, printed when the game is closed and
+        # optionally saved as a Chrome trace
+        self.profiler = Profiler(enabled=profile or (trace is not None))
+        self._trace = trace
 
-        self.game_map = Terrain()
-        self.graphics = Graphics(game_map=self.game_map, fullscreen=fullscreen)
+        self.game_map = Terrain(
+            rng=self.rng, background=(not headless) or (video is not None)
+        )
+        if headless:
+            if manual:
+                raise ValueError("Manual play is not possible in headless mode.")
+            self.graphics = None
+        else:
+            # Only import the graphics when needed, as they require a display
+            from .graphics import Graphics
+
+            self.graphics = Graphics(
+                game_map=self.game_map,
+                fullscreen=fullscreen,
+                profiler=self.profiler,
+                seed=self.seed,
+            )
+        self.asteroids = AsteroidPool(
+            batch=None if headless else self.graphics.main_batch,
+            textures=None if headless else self.graphics.textures,
+        )
 
-        colors = []
-        cmap = plt.get_cmap("gist_ncar")
-        nplayers = len(bots) + 1
-        for i in range(nplayers):
-            colors.append(cmap(i / (nplayers - 1)))
+        # The colors are only used to draw the players
+        if headless and (video is None):
+            colors = [None] * len(bots)
+        else:
+            colors = player_colors(len(bots))
 
         self.bots = {bot.team: bot for bot in bots}
+        self._teams = list(self.bots)
+        self._team_index = {team: i for i, team in enumerate(self._teams)}
+        self.snapshot = None
         starting_positions = self.make_starting_positions(nplayers=len(self.bots))
+        # The landers may be rows of a larger state, shared with other games
+        if landers is None:
+            landers = LanderState(nplayers=len(self.bots))
+        elif len(landers) != len(self.bots):
+            raise ValueError(
+                f"Expected the state of {len(self.bots)} landers, got {len(landers)}."
+            )
+        self.landers = landers
         self.players = {}
         for i, (bot, pos) in enumerate(zip(self.bots.values(), starting_positions)):
             team = bot.team
             self.players[team] = Player(
                 team=team,
                 number=i,
-                color=colors[i + 1],
+                color=colors[i],
                 position=pos,
+                state=self.landers,
                 avatar=getattr(bot, "avatar", 0),
-                back_batch=self.graphics.background_batch,
-                main_batch=self.graphics.main_batch,
+                flag=getattr(bot, "flag", None),
+                textures=None if headless else self.graphics.textures,
+                back_batch=None if headless else self.graphics.background_batch,
+                main_batch=None if headless else self.graphics.main_batch,
+                hud_batch=None if headless else self.graphics.hud_batch,
             )
+        self._player_list = list(self.players.values())
 
         if manual:
             manual_player = list(self.players.values())[0]
@@ -100,31 +194,139 @@ class Engine:
             add_key_actions(window=self.graphics.window, player=manual_player)
         else:
             self._manual = None
+        # The part of the world in view, which follows the player playing with the
+        # keyboard, or the landers
+        self.camera = Camera(follow=0 if manual else None)
+
+        self._replay = replay
+        self._recorder = None
+        if record is not None:
+            self._recorder = ReplayWriter(
+                record,
+                header={
+                    "seed": self.seed,
+                    "nx": config.nx,
+                    "teams": list(self.bots),
+                    "avatars": [getattr(b, "avatar", 0) for b in self.bots.values()],
+                    "flags": [getattr(b, "flag", None) for b in self.bots.values()],
+                    "options": {
+                        "crater_scaling": crater_scaling,
+                        "player_collisions": player_collisions,
+                        "asteroid_collisions": asteroid_collisions,
+                        "substeps": substeps,
+                    },
+                },
+            )
 
-        pyglet.clock.schedule_interval(self.update, 1 / config.fps)
-        pyglet.app.run()
+        # Time taken by the bots, and the time they are allowed per tick (seconds).
+        # The latencies are printed at the end if there is a budget or if asked for.
+        self._bot_time_budget = bot_time_budget
+        self._report_latency = report_latency or (bot_time_budget is not None)
+        self.latency = {
+            team: LatencyHistogram(budget=bot_time_budget)
+            for team in self.bots
+            if team != self._manual
+        }
+        # Run the bots in worker processes, instead of one after the other
+        self._bot_pool = None
+        if (bot_workers > 0) and (replay is None):
+            from .workers import BotPool
+
+            self._bot_pool = BotPool(
+                bots={t: b for t, b in self.bots.items() if t != self._manual},
+                teams=list(self.bots),
+                workers=bot_workers,
+                safe=safe,
+            )
+        # Frames drawn without a window, saved every few steps as images or video
+        self._video = None
+        self._video_every = video_every
+        if video is not None:
+            from .render import FrameRenderer, FrameWriter
+
+            self.renderer = FrameRenderer(self)
+            self._video = FrameWriter(video, fps=1.0 / (self.step_dt * video_every))
+
+    @property
+    def headless(self) -> bool:
+        return self.graphics is None
+
+    def run(self):
+        """
+        Play the game until it ends. In headless mode, the simulation steps are run
+        one after the other as fast as possible, instead of in real time.
+        """
+        try:
+            if self.headless:
+                while not self.exiting:
+                    self.step()
+            else:
+                import pyglet
+
+                pyglet.clock.schedule_interval(self.update, 1 / config.fps)
+                pyglet.app.run()
+        finally:
+            if self._recorder is not None:
+                self._recorder.close()
+            if self._bot_pool is not None:
+                self._bot_pool.close()
+            if self._video is not None:
+                self._video.close()
+            if self.profiler.enabled:
+                print("\nFrame profile:")
+                print(self.profiler.report())
+            if self._trace is not None:
+                self.profiler.export_chrome_trace(self._trace)
 
     def make_starting_positions(self, nplayers: int) -> list:
-        random_origin = np.random.uniform(0, config.nx)
+        random_origin = self.rng.uniform(0, config.nx)
         step = config.nx / nplayers
         choices = [int(random_origin + i * step) % config.nx for i in range(nplayers)]
-        return np.random.permutation(choices)
+        return self.rng.permutation(choices)
 
     def exit(self, message: str):
         self.exiting = True
         print(message)
-        finalize_scores(players=self.players, test=self._test)
+        if self._write_scores:
+            finalize_scores(players=self.players, test=self._test, seed=self.seed)
+        if self._report_latency and any(hist.calls for hist in self.latency.values()):
+            print("\nBot latencies:")
+            print(latency_report(self.latency))
+
+    def active_players(self, active: Optional[np.ndarray] = None):
+        """
+        The players in ``active`` (the index of the active landers, which is found
+        if it is not given).
+        """
+        if active is None:
+            active = np.flatnonzero(self.landers.active)
+        return (self._player_list[i] for i in active)
 
-    def active_players(self):
-        return (p for p in self.players.values() if (not p.dead) and (not p.landed))
+    def make_snapshot(self, t: float, dt: float) -> Snapshot:
+        n = len(self.asteroids)
+        return Snapshot(
+            t=t,
+            dt=dt,
+            terrain=self.game_map.frozen_terrain(),
+            terrain_version=self.game_map.version,
+            teams=self._teams,
+            team_index=self._team_index,
+            position=self.landers.position,
+            velocity=self.landers.velocity,
+            heading=self.landers.heading,
+            fuel=self.landers.fuel,
+            dead=self.landers.dead,
+            landed=self.landers.landed,
+            asteroid_ids=self.asteroids.ids,
+            asteroid_position=self.asteroids.tips(),
+            asteroid_velocity=self.asteroids.velocity(),
+            asteroid_heading=self.asteroids.heading[:n],
+            asteroid_size=self.asteroids.tip_sizes(),
+        )
 
     def generate_info(self, t: float, dt: float) -> dict:
-        info = {"t": t, "dt": dt, "terrain": self.game_map.terrain}
-        info["players"] = {
-            team: PlayerInfo(**p.to_dict()) for team, p in self.players.items()
-        }
-        info["asteroids"] = [AsteroidInfo(**a.to_dict()) for a in self.asteroids]
-        return info
+        self.snapshot = self.make_snapshot(t=t, dt=dt)
+        return self.snapshot.to_info()
 
     def execute_player_bot(self, team: str, info: dict) -> Instructions:
         instructions = None
@@ -137,141 +339,293 @@ class Engine:
             instructions = self.bots[team].run(**info)
         return instructions
 
-    def call_player_bots(self, t: float, dt: float):
+    def apply_bot_instructions(
+        self, player: Player, instructions: Optional[Instructions], latency: float
+    ):
+        """
+        Record the time taken by a bot, and apply its instructions if they came
+        within the time budget. Late answers are ignored: the lander keeps the
+        previous thruster settings.
+        """
+        self.latency[player.team].record(latency)
+        if (self._bot_time_budget is not None) and (latency > self._bot_time_budget):
+            return
+        if self.safe:
+            try:
+                player.execute_bot_instructions(instructions)
+            except:  # noqa
+                pass
+        else:
+            player.execute_bot_instructions(instructions)
+
+    def call_player_bots(self, t: float, dt: float, active: np.ndarray):
+        if self._bot_pool is not None:
+            return self.call_player_bots_in_pool(t, dt, active)
         info = self.generate_info(t=t, dt=dt)
-        for player in (p for p in self.active_players() if p.team != self._manual):
-            if self.safe:
-                try:
-                    player.execute_bot_instructions(
-                        self.execute_player_bot(team=player.team, info=info)
+        players = self.active_players(active)
+        for player in (p for p in players if p.team != self._manual):
+            with self.profiler.section(f"bot:{player.team}"):
+                start = time.perf_counter()
+                instructions = self.execute_player_bot(team=player.team, info=info)
+                self.apply_bot_instructions(
+                    player, instructions, latency=time.perf_counter() - start
+                )
+
+    def call_player_bots_in_pool(self, t: float, dt: float, active: np.ndarray):
+        self.snapshot = self.make_snapshot(t=t, dt=dt)
+        players = self.active_players(active)
+        results = self._bot_pool.run(
+            snapshot=self.snapshot,
+            active=[p.team for p in players if p.team != self._manual],
+            budget=self._bot_time_budget,
+        )
+        for team, instructions, latency, on_time in results:
+            if on_time:
+                self.apply_bot_instructions(self.players[team], instructions, latency)
+            else:
+                self.latency[team].record(latency)
+
+    def move_players(self, dt: float, active: Optional[np.ndarray] = None):
+        move_landers(self.landers, dt=dt, index=active)
+
+    def check_landing(
+        self, t: float, active: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        Land or crash the active landers touching the ground. ``active`` is the
+        index of the active landers (found if it is not given), and the index of
+        the landers still active afterwards is returned.
+        """
+        if active is None:
+            active = np.flatnonzero(self.landers.active)
+        position = self.landers.position[active]
+        # First column under each lander (wrapping around the edges), and the
+        # height of the bottom of the lander
+        start = np.floor(position[:, 0] - config.avatar_size[0] / 2).astype(int)
+        start %= config.nx
+        lem_floor = (position[:, 1] - config.avatar_size[1] / 2).astype(int)
+        footprints = self.game_map.footprints
+        touching = footprints.max[start] >= lem_floor
+        if not touching.any():
+            return active
+        remaining = active[~touching]
+        active = active[touching]
+        uneven_terrain = footprints.min[start[touching]] < lem_floor[touching]
+        velocity = self.landers.velocity[active]
+        too_fast = np.linalg.norm(velocity, axis=1) > config.max_landing_speed
+        landing_angle = np.abs(self.landers.heading[active])
+        bad_angle = landing_angle > config.max_landing_angle
+        crashed = uneven_terrain | too_fast | bad_angle
+
+        for k, i in enumerate(active):
+            player = self._player_list[i]
+            if crashed[k]:
+                reason = []
+                if uneven_terrain[k]:
+                    reason.append("uneven terrain")
+                if too_fast[k]:
+                    reason.append(
+                        f"velocity=[{velocity[k, 0]:.1f}, {velocity[k, 1]:.1f}]"
                     )
-                except:  # noqa
-                    pass
+                if bad_angle[k]:
+                    reason.append(f"landing angle={landing_angle[k]:.1f}")
+                player.crash(reason=", ".join(reason))
             else:
-                player.execute_bot_instructions(
-                    self.execute_player_bot(team=player.team, info=info)
+                player.land(
+                    time_left=config.time_limit - t,
+                    landing_site_width=self.game_map.landing_sites[int(player.x)],
                 )
+        return remaining
 
-    def move_players(self, dt: float):
-        for player in self.active_players():
-            player.move(dt=dt * 2)
-
-    def check_landing(self, t: float):
-        for player in self.active_players():
-            lem_floor = int(player.y - config.avatar_size[1] / 2)
-            y_values = self.game_map.terrain[
-                int(player.x - config.avatar_size[0] / 2) : int(
-                    player.x + config.avatar_size[0] / 2
-                ),
-            ]
-            if any(y_values >= lem_floor):
-                uneven_terrain = any(y_values < lem_floor)
-                too_fast = np.linalg.norm(player.velocity) > config.max_landing_speed
-                landing_angle = np.abs(player.heading)
-                bad_angle = landing_angle > config.max_landing_angle
-                if any([uneven_terrain, too_fast, bad_angle]):
-                    reason = []
-                    if uneven_terrain:
-                        reason.append("uneven terrain")
-                    if too_fast:
-                        reason.append(
-                            f"velocity=[{player.velocity[0]:.1f}, "
-                            f"{player.velocity[1]:.1f}]"
-                        )
-                    if bad_angle:
-                        reason.append(f"landing angle={landing_angle:.1f}")
-                    player.crash(reason=", ".join(reason))
-                else:
-                    player.land(
-                        time_left=config.time_limit - t,
-                        landing_site_width=self.game_map.landing_sites[int(player.x)],
-                        flag=getattr(self.bots[player.team], "flag", None),
-                    )
+    def compute_collisions(self, active: Optional[np.ndarray] = None):
+        if active is None:
+            active = np.flatnonzero(self.landers.active)
+        if len(active) < 2:
+            return
+        lems1, lems2 = close_pairs(
+            self.landers.position[active],
+            radius=config.collision_radius,
+            period=config.nx,
+        )
+        if len(lems1) == 0:
+            return
+        i = active[lems1]
+        j = active[lems2]
+        position = self.landers.position
+        velocity = self.landers.velocity
+        # Separation across the periodic boundary, if that is the shortest
+        d = position[i] - position[j]
+        d[:, 0] = periodic_dx(d[:, 0], config.nx)
+        # Exchange the velocity components along the line between the centers. All
+        # pairs use the velocities from before the collisions, and a lander hit by
+        # several others at once receives the sum of the changes.
+        dv = velocity[i] - velocity[j]
+        impulse = (np.sum(dv * d, axis=1) / np.sum(d * d, axis=1))[:, None] * d
+        np.add.at(velocity, i, -impulse)
+        np.add.at(velocity, j, impulse)
 
-    def compute_collisions(self):
-        players = list(self.active_players())
-        n = len(players)
-        x = np.array([p.x for p in players])
-        y = np.array([p.y for p in players])
-        xpos1 = np.broadcast_to(x, (n, n))
-        xpos2 = xpos1.T
-        ypos1 = np.broadcast_to(y, (n, n))
-        ypos2 = ypos1.T
-        dist = np.tril(np.sqrt((xpos2 - xpos1) ** 2 + (ypos2 - ypos1) ** 2))
-        lems1, lems2 = np.where((dist < config.collision_radius) & (dist > 0))
-        for i, j in zip(lems1, lems2):
-            p1 = players[i]
-            p2 = players[j]
-            x1 = p1.position
-            v1 = p1.velocity
-            x2 = p2.position
-            v2 = p2.velocity
-            p1.velocity = v1 - np.dot(v1 - v2, x1 - x2) / np.linalg.norm(
-                x1 - x2
-            ) ** 2 * (x1 - x2)
-            p2.velocity = v2 - np.dot(v2 - v1, x2 - x1) / np.linalg.norm(
-                x2 - x1
-            ) ** 2 * (x2 - x1)
-
-    def update_asteroids(self, t: float, dt: float):
+    def update_asteroids(
+        self, t: float, dt: float, active: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        Spawn and move the asteroids, crash the active landers they hit and make
+        craters where they hit the ground. As in :meth:`check_landing`, the index
+        of the landers still active afterwards is returned.
+        """
+        if active is None:
+            active = np.flatnonzero(self.landers.active)
         delay = (
             1.0 - config.asteroid_delay
         ) / config.time_limit * t + config.asteroid_delay
         if (t - self.time_of_last_asteroid) > delay:
-            self.asteroids.append(
-                Asteroid(
-                    x=np.random.uniform(0, config.nx),
-                    y=config.ny + 100,
-                    v=np.random.uniform(100, 200),
-                    heading=np.random.uniform(-25, -155),
-                    size=72,
-                    batch=self.graphics.main_batch,
-                )
+            self.asteroids.spawn(
+                x=self.rng.uniform(0, config.nx),
+                y=config.ny + 100,
+                v=self.rng.uniform(100, 200),
+                heading=self.rng.uniform(-25, -155),
+                size=72,
             )
             self.time_of_last_asteroid = t
-        for asteroid in self.asteroids:
-            asteroid.move(dt=dt)
-            tip = asteroid.tip()
-            tip_size = asteroid.size * config.asteroid_tip_size
-            if self._asteroid_collisions:
-                for player in self.active_players():
-                    d = np.sqrt((player.x - tip[0]) ** 2 + (player.y - tip[1]) ** 2)
-                    if d < tip_size:
-                        player.crash(reason="asteroid collision")
-            if tip[1] <= self.game_map.terrain[int(tip[0])]:
-                self.game_map.make_crater(x=int(tip[0]), scaling=self._crater_scaling)
-                asteroid.avatar.delete()
-                self.asteroids.remove(asteroid)
+        if len(self.asteroids) == 0:
+            return active
+        self.asteroids.move(dt=dt)
+        tips = self.asteroids.tips()
+        if self._asteroid_collisions and len(active) > 0:
+            d = self.landers.position[active, None, :] - tips[None, :, :]
+            dist = np.sqrt(np.sum(d * d, axis=-1))
+            hits = (dist < self.asteroids.tip_sizes()).any(axis=1)
+            for i in active[hits]:
+                self._player_list[i].crash(reason="asteroid collision")
+            active = active[~hits]
+        grounded = tips[:, 1] <= self.game_map.terrain[tips[:, 0].astype(int)]
+        if grounded.any():
+            with self.profiler.section("make_crater"):
+                for x in tips[grounded, 0]:
+                    self.game_map.make_crater(x=int(x), scaling=self._crater_scaling)
+            self.asteroids.remove(grounded)
+        return active
 
     def update(self, dt: float):
-        if self.start_time is None:
-            self.start_time = time.time()
-        t = (time.time() - self.start_time) * self._speedup
-
+        """
+        Advance the game by one rendered frame, ``dt`` seconds of wall time after the
+        previous one. The elapsed time (multiplied by the speedup) is added to an
+        accumulator, and as many fixed simulation steps as fit in it are run. The
+        outcome of a game therefore does not depend on the frame rate or the speedup,
+        only on the number of steps.
+        """
         if self.exiting:
-            if self.graphics.exit_message is None:
+            if (not self.headless) and (self.graphics.exit_message is None):
                 self.graphics.show_exit_message()
             return
 
+        with self.profiler.section("update"):
+            # Do not try to catch up after a long pause (e.g. the window being
+            # dragged)
+            self._accumulator += min(dt, config.max_frame_time) * self._speedup
+            while (self._accumulator >= self.step_dt) and (not self.exiting):
+                self._accumulator -= self.step_dt
+                self.step()
+
+            if not self.headless:
+                self.update_graphics()
+
+    def update_graphics(self):
+        section = self.profiler.section
+        t = self.sim_time
+        if abs(t - self.time_of_last_scoreboard_update) > 0.3:
+            with section("scoreboard"):
+                self.time_of_last_scoreboard_update = t
+                self.graphics.update_scoreboard(t=config.time_limit - t)
+                for player in [p for p in self.players.values() if not p.dead]:
+                    player.update_scoreboard()
+        with section("update_avatars"):
+            for player in self.active_players():
+                player.update_avatar()
+        with section("update_stars"):
+            self.graphics.update_stars(t)
+        self.update_camera()
+        self.graphics.view_x = self.camera.left
+
+    def update_camera(self):
+        self.camera.update(
+            t=self.sim_time, position=self.landers.position, active=self.landers.active
+        )
+
+    def step(self, thrusters: Optional[np.ndarray] = None):
+        """
+        Advance the simulation by one fixed time step of ``step_dt``. The game time
+        is the number of steps taken so far times the step.
+
+        If ``thrusters`` are given (main, left and right for each player), they are
+        used instead of asking the bots for instructions.
+        """
+        with self.profiler.section("step"):
+            self._step(thrusters)
+
+    def _step(self, thrusters: Optional[np.ndarray]):
+        tick = self.next_tick()
+        if tick is None:
+            return
+        t, dt = tick
+        # The landers only land or crash after they have moved: the index of the
+        # active landers is found once, and then passed on through the step
+        active = np.flatnonzero(self.landers.active)
+        # The thrusters of a replay are set by next_tick
+        if self._replay is None:
+            if thrusters is not None:
+                self.landers.set_thrusters(thrusters)
+            else:
+                with self.profiler.section("bots"):
+                    self.call_player_bots(t, dt, active)
+        with self.profiler.section("move_players"):
+            self.move_players(dt=dt, active=active)
+        self.end_step(t, dt, active)
+
+    def next_tick(self) -> Optional[Tuple[float, float]]:
+        """
+        The time and time step of the next step, or ``None`` if the game is over
+        (the game then exits). When replaying a game, the recorded thrusters are
+        also switched on.
+        """
+        if self._replay is not None:
+            tick = self._replay.next_tick()
+            if tick is None:
+                self.exit(message="End of replay!")
+                return None
+            t, dt, replayed = tick
+            self.landers.thrusters[...] = replayed
+            return t, dt
+        t = self.steps * self.step_dt
         if t > config.time_limit:
             self.exit(message="Time limit reached!")
-            return
+            return None
+        return t, self.step_dt
 
-        if abs(t - self.time_of_last_scoreboard_update) > 0.3:
-            self.time_of_last_scoreboard_update = t
-            self.graphics.update_scoreboard(t=config.time_limit - t)
-            for player in [p for p in self.players.values() if not p.dead]:
-                player.update_scoreboard(batch=self.graphics.main_batch)
-        dt = dt * self._speedup
-        self.call_player_bots(t, dt)
-        self.move_players(dt=dt)
-        self.check_landing(t=t)
+    def end_step(self, t: float, dt: float, active: Optional[np.ndarray] = None):
+        """
+        The part of a step after the landers have moved: landing, collisions and
+        asteroids. The steps are split around the motion of the landers so that the
+        landers of several games can be moved at once (see :class:`VectorEnv`).
+        ``active`` is the index of the active landers, if it is already known.
+        """
+        section = self.profiler.section
+        if self._recorder is not None:
+            self._recorder.write(t=t, dt=dt, thrusters=self.landers.thrusters)
+        if active is None:
+            active = np.flatnonzero(self.landers.active)
+        with section("check_landing"):
+            active = self.check_landing(t=t, active=active)
         if self._player_collisions:
-            self.compute_collisions()
-        self.update_asteroids(t, dt)
-        self.graphics.update_stars(t)
+            with section("compute_collisions"):
+                self.compute_collisions(active)
+        with section("update_asteroids"):
+            active = self.update_asteroids(t, dt, active)
+        self.steps += 1
+        self.sim_time = t + dt
+        if (self._video is not None) and (self.steps % self._video_every == 0):
+            with section("render"):
+                self.update_camera()
+                self._video.write(self.renderer.render())
 
-        if len(list(self.active_players())) == 0:
+        if len(active) == 0:
             self.exit(message="All players have either crashed or landed!")
-
-        return
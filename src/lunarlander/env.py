@@ -0,0 +1,233 @@
+# SPDX-License-Identifier: BSD-3-Clause
+
+import contextlib
+import io
+import sys
+from typing import Dict, Iterable, List, Sequence, Tuple, Union
+
+import numpy as np
+
+from . import config
+from .engine import Engine, move_landers
+from .player import LanderState
+
+
+class ExternalBot:
+    """
+    Stand-in for a player whose thrusters are set from outside the game (see
+    :class:`VectorEnv`).
+    """
+
+    def __init__(self, team: str):
+        self.team = team
+
+    def run(self, **kwargs):
+        return None
+
+
+class VectorEnv:
+    """
+    Several independent headless games, advanced together one step at a time, with
+    the thrusters of all the players given as an array. This is meant for training
+    bots, e.g. with reinforcement learning.
+
+    Observations are a dict of arrays, with the games along the first axis and the
+    players along the second axis: ``t``, ``position``, ``velocity``, ``heading``,
+    ``fuel``, ``dead``, ``landed`` and ``terrain``. The first ``max_asteroids``
+    asteroids are given in ``asteroid_position``, ``asteroid_velocity`` and
+    ``asteroid_size``, with ``asteroid_mask`` marking the slots in use.
+
+    The reward of a player is its score (see ``Player.land``) on the step where it
+    lands, ``crash_reward`` on the step where it crashes, and zero otherwise.
+
+    Parameters
+    ----------
+    num_envs:
+        The number of games.
+    teams:
+        The names of the players in each game, or the number of players.
+    max_asteroids:
+        The number of asteroid slots in the observations.
+    crash_reward:
+        The reward given to a player when it crashes.
+    copy:
+        Return copies of the observation arrays. The terrain is a read-only array,
+        which is only copied when a crater changes it. Otherwise, the same arrays
+        are updated in place at every step.
+    quiet:
+        Silence the messages printed by the games.
+    **kwargs:
+        Additional game options passed on to the :class:`Engine`.
+    """
+
+    def __init__(
+        self,
+        num_envs: int,
+        teams: Union[int, Sequence[str]] = 1,
+        max_asteroids: int = 8,
+        crash_reward: float = 0.0,
+        copy: bool = True,
+        quiet: bool = True,
+        **kwargs,
+    ):
+        if isinstance(teams, int):
+            teams = [f"player{i}" for i in range(teams)]
+        self.teams = list(teams)
+        self.num_envs = num_envs
+        self.num_players = len(self.teams)
+        self.max_asteroids = max_asteroids
+        self.crash_reward = crash_reward
+        self.copy = copy
+        self.quiet = quiet
+        self.options = kwargs
+        self.engines: List[Engine] = []
+
+        n, p, a = num_envs, self.num_players, max_asteroids
+        # The landers of all the games are rows of the same arrays, so that they
+        # are moved, steered and observed at once
+        self._landers = LanderState(nplayers=n * p)
+        landers = self._landers
+        self._obs = {
+            "t": np.zeros(n),
+            "position": landers.position.reshape(n, p, 2),
+            "velocity": landers.velocity.reshape(n, p, 2),
+            "heading": landers.heading.reshape(n, p),
+            "fuel": landers.fuel.reshape(n, p),
+            "dead": landers.dead.reshape(n, p),
+            "landed": landers.landed.reshape(n, p),
+            "terrain": np.zeros((n, config.nx)),
+            "asteroid_position": np.zeros((n, a, 2)),
+            "asteroid_velocity": np.zeros((n, a, 2)),
+            "asteroid_size": np.zeros((n, a)),
+            "asteroid_mask": np.zeros((n, a), dtype=bool),
+        }
+        self._terrain_versions = np.full(n, -1)
+        # The read-only copy of the terrain returned when copy is set, which is
+        # only made again when a crater changes the terrain of one of the games
+        self._terrain = None
+
+    def _output(self):
+        return contextlib.redirect_stdout(io.StringIO() if self.quiet else sys.stdout)
+
+    def reset(self, seeds: Sequence[int]) -> Dict[str, np.ndarray]:
+        """
+        Start a new game in every environment, one per seed.
+        """
+        if len(seeds) != self.num_envs:
+            raise ValueError(f"Expected {self.num_envs} seeds, got {len(seeds)}.")
+        p = self.num_players
+        with self._output():
+            self.engines = [
+                Engine(
+                    bots=[ExternalBot(team) for team in self.teams],
+                    seed=seed,
+                    headless=True,
+                    write_scores=False,
+                    landers=self._landers.rows(i * p, (i + 1) * p),
+                    **self.options,
+                )
+                for i, seed in enumerate(seeds)
+            ]
+        self._terrain_versions[:] = -1
+        self._terrain = None
+        self._observe(range(self.num_envs))
+        return self._observations()
+
+    def step(
+        self, actions: np.ndarray
+    ) -> Tuple[Dict[str, np.ndarray], np.ndarray, np.ndarray, dict]:
+        """
+        Advance all the games by one step.
+
+        Parameters
+        ----------
+        actions:
+            The main, left and right thrusters of every player, with shape
+            ``(num_envs, num_players, 3)``.
+
+        Returns
+        -------
+        The observations, the rewards and the done flags (both with shape
+        ``(num_envs, num_players)``), and a dict with the ``game_over`` flag of
+        each game. A player is done when it has landed or crashed, or when its
+        game is over. Games that are over are not advanced any further.
+        """
+        actions = np.asarray(actions, dtype=bool)
+        expected = (self.num_envs, self.num_players, 3)
+        if actions.shape != expected:
+            raise ValueError(
+                f"Expected actions of shape {expected}, got {actions.shape}."
+            )
+        landers = self._landers
+        before = ~landers.active
+        with self._output():
+            ticks = [
+                None if engine.exiting else engine.next_tick()
+                for engine in self.engines
+            ]
+            ticking = np.array([tick is not None for tick in ticks])
+            running = np.flatnonzero(ticking)
+            moving = np.repeat(ticking, self.num_players)
+            landers.set_thrusters(actions.reshape(-1, 3) & moving[:, None])
+            if len(running) > 0:
+                dt = ticks[running[0]][1]
+                move_landers(
+                    landers, dt=dt, index=np.flatnonzero(landers.active & moving)
+                )
+            for i in running:
+                self.engines[i].end_step(*ticks[i])
+        self._observe(running)
+
+        game_over = np.array([engine.exiting for engine in self.engines])
+        done = ~landers.active
+        rewards = np.zeros(len(landers))
+        finished = np.flatnonzero(done & ~before)
+        rewards[finished] = self.crash_reward
+        for k in finished[landers.landed[finished]]:
+            i, j = divmod(k, self.num_players)
+            rewards[k] = self.engines[i].players[self.teams[j]].score
+        shape = (self.num_envs, self.num_players)
+        dones = done.reshape(shape) | game_over[:, None]
+        return (
+            self._observations(),
+            rewards.reshape(shape),
+            dones,
+            {"game_over": game_over},
+        )
+
+    def _observe(self, envs: Iterable[int]):
+        """
+        Update the observations that are not views of the landers.
+        """
+        obs = self._obs
+        for i in envs:
+            engine = self.engines[i]
+            obs["t"][i] = engine.sim_time
+            if self._terrain_versions[i] != engine.game_map.version:
+                obs["terrain"][i] = engine.game_map.terrain
+                self._terrain_versions[i] = engine.game_map.version
+                self._terrain = None
+            asteroids = engine.asteroids
+            m = min(len(asteroids), self.max_asteroids)
+            obs["asteroid_mask"][i] = False
+            obs["asteroid_mask"][i, :m] = True
+            if m > 0:
+                obs["asteroid_position"][i, :m] = asteroids.tips()[:m]
+                obs["asteroid_velocity"][i, :m] = asteroids.velocity()[:m]
+                obs["asteroid_size"][i, :m] = asteroids.tip_sizes()[:m]
+            # The empty slots are cleared, so that they do not depend on the
+            # asteroids of earlier steps or games
+            obs["asteroid_position"][i, m:] = 0
+            obs["asteroid_velocity"][i, m:] = 0
+            obs["asteroid_size"][i, m:] = 0
+
+    def _observations(self) -> Dict[str, np.ndarray]:
+        if not self.copy:
+            return self._obs
+        if self._terrain is None:
+            self._terrain = self._obs["terrain"].copy()
+            self._terrain.flags.writeable = False
+        return {
+            key: self._terrain if key == "terrain" else value.copy()
+            for key, value in self._obs.items()
+        }
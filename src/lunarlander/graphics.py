@@ -1,19 +1,90 @@
 # SPDX-License-Identifier: BSD-3-Clause
 
 import datetime
+from collections import OrderedDict
+from typing import Optional
 
 import numpy as np
 import pyglet
+from pyglet import gl
+from pyglet.math import Mat4, Vec3
 
 from . import config
-from .terrain import Terrain
-from .tools import text_to_image
+from .images import TextureCache, array_to_image
+from .profiler import Profiler
+from .terrain import EARTH_POSITION, Terrain
+from .tools import TextLine
+
+# The brightness of the stars is computed on the GPU, so that the cost of the star
+# field does not depend on the number of stars
+STAR_VERTEX_SOURCE = """#version 150 core
+    in vec2 position;
+    in float t0;
+    out float alpha;
+
+    uniform float time;
+    uniform float period;
+
+    uniform WindowBlock
+    {
+        mat4 projection;
+        mat4 view;
+    } window;
+
+    void main()
+    {
+        gl_Position = window.projection * window.view * vec4(position, 0.0, 1.0);
+        float s = sin(3.14159265 * (mod(time, period) - t0) / period);
+        alpha = s * s;
+    }
+"""
+
+STAR_FRAGMENT_SOURCE = """#version 150 core
+    in float alpha;
+    out vec4 final_color;
+
+    void main()
+    {
+        final_color = vec4(1.0, 1.0, 1.0, alpha);
+    }
+"""
+
+
+class StarGroup(pyglet.graphics.Group):
+    """
+    Rendering state for the star field: the twinkle shader, with the current time
+    as a uniform, and alpha blending.
+    """
+
+    def __init__(self, program: pyglet.graphics.shader.ShaderProgram):
+        super().__init__()
+        self.program = program
+        self.time = 0.0
+
+    def set_state(self):
+        self.program.bind()
+        self.program["time"] = self.time
+        self.program["period"] = config.twinkle_period
+        gl.glEnable(gl.GL_BLEND)
+        gl.glBlendFunc(gl.GL_SRC_ALPHA, gl.GL_ONE_MINUS_SRC_ALPHA)
+        gl.glPointSize(2.0)
+
+    def unset_state(self):
+        gl.glPointSize(1.0)
+        gl.glDisable(gl.GL_BLEND)
+        self.program.unbind()
 
 
 class Graphics:
-    def __init__(self, game_map: Terrain, fullscreen: bool = False):
+    def __init__(
+        self,
+        game_map: Terrain,
+        fullscreen: bool = False,
+        profiler: Optional[Profiler] = None,
+        seed: Optional[int] = None,
+    ):
         self.window = pyglet.window.Window(
-            config.nx + config.scoreboard_width,
+            config.view_nx + config.scoreboard_width,
             config.ny,
             caption="Lunar Lander",
             fullscreen=fullscreen,
@@ -21,70 +92,149 @@ class Graphics:
         )
 
         self.game_map = game_map
+        self.profiler = Profiler() if profiler is None else profiler
+        self.textures = TextureCache()
+        # The tiles of the background are uploaded to the GPU when they come into
+        # view, and only the regions changed by craters are updated afterwards
+        self.tiles = OrderedDict()
+        # First column of the world in view (the sprites are in world coordinates)
+        self.view_x = 0
+        self.sky_batch = pyglet.graphics.Batch()
         self.star_batch = pyglet.graphics.Batch()
         self.background_batch = pyglet.graphics.Batch()
         self.main_batch = pyglet.graphics.Batch()
-        self.time_label = pyglet.sprite.Sprite(
-            img=text_to_image(
-                "Time left:", width=100, height=24, font=config.large_font
-            ),
-            x=config.nx + 20,
-            y=config.ny - 30,
-            batch=self.main_batch,
+        self.panel_batch = pyglet.graphics.Batch()
+        self.hud_batch = pyglet.graphics.Batch()
+        earth = self.game_map.background.earth
+        self.earth = pyglet.sprite.Sprite(
+            img=self.textures.add("earth", earth, anchor=(0, 0)),
+            x=EARTH_POSITION[0],
+            y=config.ny - EARTH_POSITION[1] - earth.shape[0],
+            batch=self.sky_batch,
+        )
+        self.panel = pyglet.shapes.Rectangle(
+            x=config.view_nx,
+            y=0,
+            width=config.scoreboard_width,
+            height=config.ny,
+            color=(20, 20, 20),
+            batch=self.panel_batch,
+        )
+        self.time_label = TextLine(
+            x=config.view_nx + 20,
+            y=config.ny - 6,
+            batch=self.hud_batch,
+            text="Time left:",
+            font_size=12,
+        )
+        self.time_left = TextLine(
+            x=config.view_nx + 110,
+            y=config.ny - 6,
+            batch=self.hud_batch,
+            font_size=12,
         )
-        self.time_left = None
         self.exit_message = None
-        self.make_stars()
+        # The stars have their own random stream, so that drawing them does not
+        # change the game
+        self.make_stars(rng=np.random.RandomState(seed))
 
         @self.window.event
         def on_draw():
-            self.window.clear()
-            self.game_map.background_image.get_texture().blit(0, 0)
-            self.star_batch.draw()
+            section = self.profiler.section
+            with section("on_draw"):
+                self.window.clear()
+                with section("update_background"):
+                    self.update_background()
+                with section("draw"):
+                    self.draw()
+
+    def draw(self):
+        background = self.game_map.background
+        for i, offset in background.visible(self.view_x, config.view_nx):
+            self.tile_texture(i).blit(offset, 0)
+        self.sky_batch.draw()
+        self.star_batch.draw()
+        # The sprites are drawn a second time on the other side of the right edge
+        # of the world, when the view goes across it
+        shifts = [-self.view_x]
+        if self.view_x + config.view_nx > config.nx:
+            shifts.append(config.nx - self.view_x)
+        for shift in shifts:
+            self.window.view = Mat4.from_translation(Vec3(shift, 0, 0))
             self.background_batch.draw()
             self.main_batch.draw()
+        self.window.view = Mat4()
+        self.panel_batch.draw()
+        self.hud_batch.draw()
+
+    def tile_texture(self, i: int) -> pyglet.image.Texture:
+        """
+        The texture of tile ``i`` of the background, uploaded if it is not on the GPU.
+        Only as many textures as tiles kept by the background are kept.
+        """
+        texture = self.tiles.get(i)
+        if texture is None:
+            tile = self.game_map.background.tile(i)
+            texture = self.tiles[i] = array_to_image(tile).get_texture()
+            if len(self.tiles) > self.game_map.background.capacity:
+                self.tiles.popitem(last=False)[1].delete()
+        else:
+            self.tiles.move_to_end(i)
+        return texture
 
-    def make_stars(self):
-        self.stars = []
-        self.star_t0 = np.random.uniform(0, config.twinkle_period, config.nstars)
-        xstar = np.random.uniform(0, config.nx, config.nstars)
-        ystar = np.random.uniform(0, config.ny, config.nstars)
-        for x, y in zip(xstar, ystar):
-            self.stars.append(
-                pyglet.shapes.Circle(
-                    x, y, 1, color=(255, 255, 255, 255), batch=self.star_batch
+    def update_background(self):
+        background = self.game_map.background
+        regions = self.game_map.dirty_regions
+        for x0, x1, y0, y1 in regions:
+            for i in range(x0 // background.tile_size, -(-x1 // background.tile_size)):
+                texture = self.tiles.get(i)
+                if texture is None:
+                    # Made from the current terrain when it comes into view
+                    continue
+                t0, t1 = background.columns(i)
+                a, b = max(x0, t0), min(x1, t1)
+                texture.blit_into(
+                    array_to_image(background.tile(i)[y0:y1, a - t0 : b - t0]),
+                    x=a - t0,
+                    y=config.ny - y1,
+                    z=0,
                 )
-            )
+        regions.clear()
+
+    def make_stars(self, rng: np.random.RandomState):
+        """
+        Make the star field, as a single list of points.
+        """
+        self.star_t0 = rng.uniform(0, config.twinkle_period, config.nstars)
+        xstar = rng.uniform(0, config.view_nx, config.nstars)
+        ystar = rng.uniform(0, config.ny, config.nstars)
+        program = gl.current_context.create_program(
+            (STAR_VERTEX_SOURCE, "vertex"), (STAR_FRAGMENT_SOURCE, "fragment")
+        )
+        self.star_group = StarGroup(program=program)
+        self.stars = program.vertex_list(
+            config.nstars,
+            gl.GL_POINTS,
+            batch=self.star_batch,
+            group=self.star_group,
+            position=("f", np.stack([xstar, ystar], axis=1).ravel().tolist()),
+            t0=("f", self.star_t0.tolist()),
+        )
 
     def update_stars(self, t: float):
-        for star, t0 in zip(self.stars, self.star_t0):
-            star.opacity = int(
-                255
-                * np.sin(
-                    np.pi * ((t % config.twinkle_period) - t0) / config.twinkle_period
-                )
-                ** 2
-            )
+        self.star_group.time = t
 
     def update_scoreboard(self, t: float):
-        if self.time_left is not None:
-            self.time_left.delete()
-        t_str = str(datetime.timedelta(seconds=int(t)))[2:]
-        self.time_left = pyglet.sprite.Sprite(
-            img=text_to_image(t_str, width=100, height=24, font=config.large_font),
-            x=self.time_label.x + 90,
-            y=self.time_label.y,
-            batch=self.main_batch,
-        )
+        self.time_left.set_text(str(datetime.timedelta(seconds=int(t)))[2:])
 
     def show_exit_message(self):
         self.exit_message = pyglet.text.Label(
             "Press ESC to exit",
             color=(153, 51, 153, 255),
             font_size=80,
-            x=config.nx * 0.5,
+            x=config.view_nx * 0.5,
             y=config.ny * 0.5,
-            batch=self.main_batch,
+            batch=self.hud_batch,
             anchor_x="center",
             anchor_y="center",
         )
@@ -0,0 +1,164 @@
+# SPDX-License-Identifier: BSD-3-Clause
+
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, Optional, Tuple, Union
+
+import numpy as np
+
+from . import config
+from .cache import cached_array, file_hash, make_key
+
+if TYPE_CHECKING:
+    import pyglet
+
+
+@lru_cache(maxsize=None)
+def load_image(path, size: Optional[Tuple[int, int]] = None) -> np.ndarray:
+    """
+    Load an image as a (read-only) RGBA array, optionally resized. Images are only
+    decoded once per process, and decoded images are also kept in the on-disk cache,
+    keyed by the contents of the file and the size.
+    """
+
+    def decode():
+        from PIL import Image
+
+        img = Image.open(path)
+        if (size is not None) and (img.size != tuple(size)):
+            img = img.resize(size)
+        return np.asarray(img.convert("RGBA"), dtype=np.uint8)
+
+    array = cached_array("images", make_key(file_hash(path), size), decode)
+    array.flags.writeable = False
+    return array
+
+
+def tint(array: np.ndarray, color: tuple) -> np.ndarray:
+    """
+    Paint all the pixels of an image with a color, keeping the alpha channel.
+    """
+    out = np.array(array)
+    out[..., :3] = [int(round(c * 255)) for c in color[:3]]
+    return out
+
+
+def avatar_image(avatar: Union[int, str], color: tuple) -> np.ndarray:
+    if isinstance(avatar, str):
+        return load_image(avatar, size=config.avatar_size)
+    path = config.resources / "avatars" / f"{avatar}.png"
+    return tint(load_image(path, size=config.avatar_size), color)
+
+
+def skull_image(color: tuple) -> np.ndarray:
+    return tint(
+        load_image(config.resources / "skull.png", size=config.avatar_size), color
+    )
+
+
+@lru_cache(maxsize=None)
+def flag_image(flag: str) -> np.ndarray:
+    path = config.resources / "flags" / f"{flag}.png"
+    if not path.is_file():
+        path = flag
+    from PIL import Image
+
+    img = Image.open(path)
+    width = int(config.avatar_size[0] / 1.5)
+    height = int(width * (img.height / img.width))
+    return load_image(path, size=(width, height))
+
+
+@lru_cache(maxsize=None)
+def flame_image(scale: float, rotation: float = 0) -> np.ndarray:
+    from PIL import Image
+
+    size = (int(config.avatar_size[0] * scale), int(config.avatar_size[1] * scale))
+    flame = Image.fromarray(load_image(config.resources / "flame.png", size=size))
+    return np.asarray(flame.rotate(rotation))
+
+
+def sprite_images() -> Dict[str, Tuple[np.ndarray, Optional[Tuple[int, int]]]]:
+    """
+    The images shared by all the teams, with their anchors (``None`` is the center
+    of the image). Anchors are in pixels from the bottom left corner, and the flames
+    are placed around the center of the lander.
+    """
+    s = config.avatar_size
+    main_flame = flame_image(0.75)
+    left_flame = flame_image(0.5, rotation=-90)
+    right_flame = flame_image(0.5, rotation=90)
+    return {
+        "lem-background": (
+            load_image(config.resources / "lem-background.png", size=s),
+            None,
+        ),
+        "asteroid": (load_image(config.resources / "asteroid.png"), None),
+        "main-flame": (main_flame, (main_flame.shape[1] // 2, s[1])),
+        "left-flame": (
+            left_flame,
+            ((s[0] // 2) + left_flame.shape[1], int(0.75 * left_flame.shape[0])),
+        ),
+        "right-flame": (
+            right_flame,
+            (-s[0] // 2, int(0.75 * right_flame.shape[0])),
+        ),
+    }
+
+
+def array_to_image(array: np.ndarray) -> pyglet.image.ImageData:
+    import pyglet
+
+    return pyglet.image.ImageData(
+        width=array.shape[1],
+        height=array.shape[0],
+        fmt="RGBA",
+        data=np.ascontiguousarray(array).tobytes(),
+        pitch=-array.shape[1] * 4,
+    )
+
+
+class TextureCache:
+    """
+    Textures for the sprites in the game, packed into a texture atlas. The textures
+    for a team (avatar, skull and flag) are all made when the team is added, so that
+    crashes and landings during the game only need to create sprites.
+    """
+
+    def __init__(self):
+        import pyglet
+
+        self._bin = pyglet.image.atlas.TextureBin()
+        self._textures = {}
+        for key, (array, anchor) in sprite_images().items():
+            self.add(key, array, anchor=anchor)
+
+    def __getitem__(self, key: str) -> pyglet.image.TextureRegion:
+        return self._textures[key]
+
+    def add(
+        self, key: str, array: np.ndarray, anchor: Optional[Tuple[int, int]] = None
+    ) -> pyglet.image.TextureRegion:
+        """
+        Add an image to the atlas. By default, the anchor is the center of the image.
+        """
+        if key not in self._textures:
+            texture = self._bin.add(array_to_image(array), border=1)
+            if anchor is None:
+                anchor = (array.shape[1] // 2, array.shape[0] // 2)
+            texture.anchor_x, texture.anchor_y = anchor
+            self._textures[key] = texture
+        return self._textures[key]
+
+    def add_team(
+        self,
+        team: str,
+        color: tuple,
+        avatar: Union[int, str],
+        flag: Optional[str] = None,
+    ):
+        self.add(f"avatar-{team}", avatar_image(avatar, color))
+        self.add(f"skull-{team}", skull_image(color))
+        if flag is not None:
+            self.add(f"flag-{team}", flag_image(flag), anchor=(0, 0))
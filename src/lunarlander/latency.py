@@ -0,0 +1,72 @@
+# SPDX-License-Identifier: BSD-3-Clause
+
+from bisect import bisect_left
+from typing import Dict, Optional
+
+import numpy as np
+
+# Logarithmic bins from 1 microsecond to 100 seconds, 20 bins per decade
+BIN_EDGES = np.geomspace(1.0e-6, 1.0e2, 8 * 20 + 1)
+# The same edges, to find the bin of a single time without calling numpy
+_EDGES = BIN_EDGES.tolist()
+
+
+class LatencyHistogram:
+    """
+    Histogram of the time taken by the calls to a bot, with logarithmic bins.
+    Percentiles are estimated from the bins (to within about 12%).
+    """
+
+    def __init__(self, budget: Optional[float] = None):
+        self.budget = budget
+        self.counts = np.zeros(len(BIN_EDGES) + 1, dtype=np.int64)
+        self.calls = 0
+        self.overruns = 0
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        self.counts[bisect_left(_EDGES, seconds)] += 1
+        self.calls += 1
+        self.max = max(self.max, seconds)
+        if (self.budget is not None) and (seconds > self.budget):
+            self.overruns += 1
+
+    def percentile(self, q: float) -> float:
+        """
+        Estimate the ``q``-th percentile (between 0 and 100), as the upper edge of
+        the bin that contains it.
+        """
+        if self.calls == 0:
+            return np.nan
+        ind = int(np.searchsorted(np.cumsum(self.counts), q / 100 * self.calls))
+        if ind >= len(BIN_EDGES):
+            return self.max
+        return min(BIN_EDGES[ind], self.max)
+
+    def to_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "p50": self.percentile(50),
+            "p99": self.percentile(99),
+            "max": self.max,
+            "overruns": self.overruns,
+        }
+
+
+def latency_report(latencies: Dict[str, LatencyHistogram]) -> str:
+    """
+    Format the bot latencies as a table, with times in milliseconds.
+    """
+    width = max([len(team) for team in latencies] + [4])
+    lines = [
+        f"{'Team':<{width}}  {'calls':>6}  {'p50 ms':>8}  {'p99 ms':>8}  "
+        f"{'max ms':>8}  {'overruns':>8}"
+    ]
+    for team, hist in latencies.items():
+        stats = hist.to_dict()
+        lines.append(
+            f"{team:<{width}}  {stats['calls']:>6}  {stats['p50'] * 1e3:>8.2f}  "
+            f"{stats['p99'] * 1e3:>8.2f}  {stats['max'] * 1e3:>8.2f}  "
+            f"{stats['overruns']:>8}"
+        )
+    return "\n".join(lines)
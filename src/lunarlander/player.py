@@ -1,17 +1,107 @@
 # SPDX-License-Identifier: BSD-3-Clause
 
-from typing import Optional, Union
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Optional, Union
 
 import numpy as np
-import pyglet
-from matplotlib.colors import hex2color
-from PIL import Image
 
 from . import config
-from .tools import Instructions, image_to_sprite, recenter_image, text_to_raw_image
+from .images import TextureCache
+from .tools import Instructions, TextLine
+
+if TYPE_CHECKING:
+    import pyglet
+
+
+class LanderState:
+    """
+    Physical state of all the landers in a game, stored as contiguous arrays (one
+    row per player) so that the physics can be integrated for all players at once.
+    """
+
+    def __init__(self, nplayers: int):
+        self.position = np.zeros((nplayers, 2))
+        self.velocity = np.zeros((nplayers, 2))
+        self.heading = np.zeros(nplayers)
+        self.fuel = np.zeros(nplayers)
+        # Columns are: main, left and right thrusters
+        self.thrusters = np.zeros((nplayers, 3), dtype=bool)
+        self.dead = np.zeros(nplayers, dtype=bool)
+        self.landed = np.zeros(nplayers, dtype=bool)
+
+    def __len__(self) -> int:
+        return len(self.heading)
+
+    def rows(self, start: int, stop: int) -> "LanderState":
+        """
+        A state made of the rows ``start:stop`` of this one, which shares its arrays
+        (e.g. the landers of one of several games, see :class:`VectorEnv`).
+        """
+        state = LanderState(nplayers=0)
+        keys = (
+            "position",
+            "velocity",
+            "heading",
+            "fuel",
+            "thrusters",
+            "dead",
+            "landed",
+        )
+        for key in keys:
+            setattr(state, key, getattr(self, key)[start:stop])
+        return state
+
+    @property
+    def active(self) -> np.ndarray:
+        return ~(self.dead | self.landed)
+
+    def set_thrusters(self, thrusters: np.ndarray):
+        """
+        Set the main, left and right thrusters of every lander. Thrusters can only
+        be switched on by the landers that can fly.
+        """
+        flying = (self.fuel > 0) & ~self.dead
+        self.thrusters[...] = np.asarray(thrusters) & flying[:, None]
+
+    def move(self, dt: float, index: Optional[np.ndarray] = None):
+        """
+        Integrate the motion of the landers in ``index`` (all the active landers by
+        default) over one time step.
+        """
+        if index is None:
+            index = np.flatnonzero(self.active)
+        # When all the landers move, work on views instead of copies of the rows
+        ind = slice(None) if len(index) == len(self) else index
+        fuel = self.fuel[ind]
+        has_fuel = fuel > 0
+        main, left, right = (self.thrusters[ind] & has_fuel[:, None]).T
+        heading = self.heading[ind]
+
+        h = np.radians(heading + 90.0)
+        thrust = config.thrust * main
+        velocity = self.velocity[ind]
+        velocity[:, 0] += (config.gravity[0] + thrust * np.cos(h)) * dt
+        velocity[:, 1] += (config.gravity[1] + thrust * np.sin(h)) * dt
+        position = self.position[ind] + velocity * dt
+        position[:, 0] %= config.nx
+        self.velocity[ind] = velocity
+        self.position[ind] = position
+
+        heading += config.rotation_speed * dt * (left.astype(float) - right)
+        self.heading[ind] = ((heading + 180) % 360) - 180
+
+        fuel -= config.main_engine_burn_rate * dt * main
+        fuel -= config.rotation_engine_burn_rate * dt * (left | right)
+        self.fuel[ind] = fuel
 
 
 class Player:
+    """
+    A player's lander. The physical state is a view over one row of the
+    :class:`LanderState` arrays owned by the engine.
+    """
+
     def __init__(
         self,
         number: int,
@@ -19,249 +109,225 @@ class Player:
         color: str,
         avatar: Union[int, str],
         position: float,
-        back_batch: pyglet.graphics.Batch,
-        main_batch: pyglet.graphics.Batch,
+        state: LanderState,
+        flag: Optional[str] = None,
+        textures: Optional[TextureCache] = None,
+        back_batch: Optional[pyglet.graphics.Batch] = None,
+        main_batch: Optional[pyglet.graphics.Batch] = None,
+        hud_batch: Optional[pyglet.graphics.Batch] = None,
     ):
         self.team = team
         self.number = number
         self.score = 0
-        self.score_text = None
-        self._main_thruster = False
-        self._left_thruster = False
-        self._right_thruster = False
+        self.score_breakdown = {}
+        self.score_lines = []
+        self._state = state
+        self.main_thruster = False
+        self.left_thruster = False
+        self.right_thruster = False
         self.fuel = config.max_fuel
         self.velocity = np.array([40.0, 0.0])
-
-        self._rotate_left = False
-        self._rotate_right = False
-        self.color = color
-        self.make_avatar(
-            avatar=avatar,
-            position=position,
-            back_batch=back_batch,
-            main_batch=main_batch,
-        )
+        self.position = np.array([position, config.ny - 100])
         self.heading = 90
         self.dead = False
         self.landed = False
+        self.crash_reason = None
+        self.landing_time = None
+
+        self.color = color
+        self.flag = flag
+        # Sprites are only created when the game is rendered (not in headless mode)
+        self.avatar = None
+        self._textures = textures
+        if main_batch is not None:
+            textures.add_team(team=team, color=color, avatar=avatar, flag=flag)
+            self.make_avatar(
+                back_batch=back_batch, main_batch=main_batch, hud_batch=hud_batch
+            )
+            self.update_avatar()
 
     def make_avatar(
         self,
-        avatar: Union[int, str],
-        position: float,
         back_batch: pyglet.graphics.Batch,
         main_batch: pyglet.graphics.Batch,
+        hud_batch: pyglet.graphics.Batch,
     ):
+        import pyglet
+
+        textures = self._textures
         # Dark background
-        bkg = pyglet.image.load(config.resources / "lem-background.png")
         self.avatar_background = pyglet.sprite.Sprite(
-            img=recenter_image(bkg),
-            x=position,
-            y=config.ny - 100,
-            batch=back_batch,
+            img=textures["lem-background"], batch=back_batch
         )
-        self.avatar_background.width = config.avatar_size[0]
-        self.avatar_background.height = config.avatar_size[1]
-
         # Avatar foreground
-        if isinstance(avatar, str):
-            img = Image.open(avatar).resize(config.avatar_size).convert("RGBA")
-        else:
-            img = Image.open(config.resources / "avatars" / f"{avatar}.png")
-            img = img.resize(config.avatar_size).convert("RGBA")
-            data = img.getdata()
-            array = np.array(data).reshape(img.height, img.width, 4)
-            # rgb = hex2color(self.color)
-            for i in range(3):
-                array[..., i] = int(round(self.color[i] * 255))
-            img = Image.fromarray(array.astype(np.uint8))
-        self.avatar = image_to_sprite(
-            img=img,
-            x=position,
-            y=config.ny - 100,
-            batch=main_batch,
+        self.avatar = pyglet.sprite.Sprite(
+            img=textures[f"avatar-{self.team}"], batch=main_batch
         )
-        self.score_avatar = image_to_sprite(
-            img=img,
-            x=config.nx + 30,
+        self.score_avatar = pyglet.sprite.Sprite(
+            img=textures[f"avatar-{self.team}"],
+            x=config.view_nx + 30,
             y=config.ny - 100 - 75 * self.number,
-            batch=main_batch,
-        )
-
-        # Main flame
-        flame_img = Image.open(config.resources / "flame.png")
-        s = 0.75
-        main_flame_img = flame_img.resize(
-            (int(config.avatar_size[0] * s), int(config.avatar_size[1] * s))
+            batch=hud_batch,
         )
-        self.main_flame = image_to_sprite(
-            img=main_flame_img,
-            x=self.avatar.x,
-            y=self.avatar.y,
-            batch=main_batch,
-            anchor=[main_flame_img.width // 2, config.avatar_size[1]],
+        # Scoreboard text, one line per field (the team name never changes)
+        self.score_lines = [
+            TextLine(
+                x=config.view_nx + 55,
+                y=config.ny - 66 - 75 * self.number - 14 * i,
+                batch=hud_batch,
+                text=f"Team {self.team}" if i == 0 else "",
+            )
+            for i in range(4)
+        ]
+        # Flames
+        self.main_flame = pyglet.sprite.Sprite(
+            img=textures["main-flame"], batch=main_batch
         )
-        self.main_flame.opacity = 0
-
-        # Left flame
-        s = 0.5
-        left_flame_img = flame_img.resize(
-            (int(config.avatar_size[0] * s), int(config.avatar_size[1] * s))
-        ).rotate(-90)
-        self.left_flame = image_to_sprite(
-            img=left_flame_img,
-            x=self.avatar.x,
-            y=self.avatar.y,
-            batch=main_batch,
-            anchor=[
-                (config.avatar_size[0] // 2) + left_flame_img.width,
-                int(0.75 * left_flame_img.height),
-            ],
+        self.left_flame = pyglet.sprite.Sprite(
+            img=textures["left-flame"], batch=main_batch
         )
-        self.left_flame.opacity = 0
-
-        # Right flame
-        right_flame_img = flame_img.resize(
-            (int(config.avatar_size[0] * s), int(config.avatar_size[1] * s))
-        ).rotate(90)
-        self.right_flame = image_to_sprite(
-            img=right_flame_img,
-            x=self.avatar.x,
-            y=self.avatar.y,
-            batch=main_batch,
-            anchor=[-config.avatar_size[0] // 2, int(0.75 * right_flame_img.height)],
+        self.right_flame = pyglet.sprite.Sprite(
+            img=textures["right-flame"], batch=main_batch
         )
-        self.right_flame.opacity = 0
+
+    def update_avatar(self):
+        """
+        Move the sprites to the current position and heading of the lander.
+        """
+        x, y = self.position
+        rotation = -((self.heading + 360) % 360)
+        for sprite in (
+            self.avatar,
+            self.avatar_background,
+            self.main_flame,
+            self.left_flame,
+            self.right_flame,
+        ):
+            sprite.x = x
+            sprite.y = y
+        for sprite in (self.avatar, self.main_flame, self.left_flame, self.right_flame):
+            sprite.rotation = rotation
+        self.main_flame.opacity = 255 * self.main_thruster
+        self.left_flame.opacity = 255 * self.left_thruster
+        self.right_flame.opacity = 255 * self.right_thruster
 
     @property
     def x(self) -> float:
-        return self.avatar.x
+        return self._state.position[self.number, 0]
 
     @x.setter
     def x(self, value: float):
-        self.avatar.x = value
-        self.avatar_background.x = value
-        self.main_flame.x = value
-        self.left_flame.x = value
-        self.right_flame.x = value
+        self._state.position[self.number, 0] = value
 
     @property
     def y(self) -> float:
-        return self.avatar.y
+        return self._state.position[self.number, 1]
 
     @y.setter
     def y(self, value: float):
-        self.avatar.y = value
-        self.avatar_background.y = value
-        self.main_flame.y = value
-        self.left_flame.y = value
-        self.right_flame.y = value
+        self._state.position[self.number, 1] = value
 
     @property
     def position(self) -> np.ndarray:
-        return np.array([self.x, self.y])
+        return self._state.position[self.number]
+
+    @position.setter
+    def position(self, value: np.ndarray):
+        self._state.position[self.number] = value
+
+    @property
+    def velocity(self) -> np.ndarray:
+        return self._state.velocity[self.number]
+
+    @velocity.setter
+    def velocity(self, value: np.ndarray):
+        self._state.velocity[self.number] = value
 
     @property
     def heading(self) -> float:
-        angle = -self.avatar.rotation
-        return ((angle + 180) % 360) - 180
+        return self._state.heading[self.number]
 
     @heading.setter
     def heading(self, value: float):
-        value = (value + 360) % 360
-        self.avatar.rotation = -value
-        self.main_flame.rotation = -value
-        self.left_flame.rotation = -value
-        self.right_flame.rotation = -value
+        self._state.heading[self.number] = ((value + 180) % 360) - 180
+
+    @property
+    def fuel(self) -> float:
+        return self._state.fuel[self.number]
+
+    @fuel.setter
+    def fuel(self, value: float):
+        self._state.fuel[self.number] = value
+
+    @property
+    def dead(self) -> bool:
+        return bool(self._state.dead[self.number])
+
+    @dead.setter
+    def dead(self, value: bool):
+        self._state.dead[self.number] = value
+
+    @property
+    def landed(self) -> bool:
+        return bool(self._state.landed[self.number])
+
+    @landed.setter
+    def landed(self, value: bool):
+        self._state.landed[self.number] = value
 
     @property
     def main_thruster(self) -> bool:
-        return self._main_thruster
+        return bool(self._state.thrusters[self.number, 0])
 
     @main_thruster.setter
     def main_thruster(self, value: bool):
-        self._main_thruster = value
-        self.main_flame.opacity = 255 * value
+        self._state.thrusters[self.number, 0] = value
 
     @property
     def left_thruster(self) -> bool:
-        return self._left_thruster
+        return bool(self._state.thrusters[self.number, 1])
 
     @left_thruster.setter
     def left_thruster(self, value: bool):
-        self._left_thruster = value
-        self.left_flame.opacity = 255 * value
+        self._state.thrusters[self.number, 1] = value
 
     @property
     def right_thruster(self) -> bool:
-        return self._right_thruster
+        return bool(self._state.thrusters[self.number, 2])
 
     @right_thruster.setter
     def right_thruster(self, value: bool):
-        self._right_thruster = value
-        self.right_flame.opacity = 255 * value
+        self._state.thrusters[self.number, 2] = value
 
     @property
     def flying(self) -> bool:
         return (self.fuel > 0) and (not self.dead)
 
-    def get_thrust(self) -> np.ndarray:
-        h = np.radians(self.heading + 90.0)
-        vector = np.array([np.cos(h), np.sin(h)])
-        return (config.thrust * self.main_thruster * (self.fuel > 0)) * vector
-
-    def move(self, dt: float):
-        acceleration = config.gravity + self.get_thrust()
-        self.velocity += acceleration * dt
-        self.x += self.velocity[0] * dt
-        self.y += self.velocity[1] * dt
-        self.x = self.x % config.nx
-
-        if self.left_thruster and (self.fuel > 0):
-            self.heading += config.rotation_speed * dt
-        if self.right_thruster and (self.fuel > 0):
-            self.heading -= config.rotation_speed * dt
-
-        if self.fuel > 0:
-            if self.main_thruster:
-                self.fuel -= config.main_engine_burn_rate * dt
-            if self.left_thruster or self.right_thruster:
-                self.fuel -= config.rotation_engine_burn_rate * dt
-
     def crash(self, reason: str):
         self.dead = True
-        # x, y = self.x, self.y
-        img = Image.open(config.resources / "skull.png")
-        img = img.resize(config.avatar_size).convert("RGBA")
-        data = img.getdata()
-        array = np.array(data).reshape(img.height, img.width, 4)
-        rgb = hex2color(self.color)
-        for i in range(3):
-            array[..., i] = int(round(rgb[i] * 255))
-
-        av_image = Image.fromarray(array.astype(np.uint8))
+        self.crash_reason = reason
+        print(f"Player {self.team} crashed! Reason: {reason}.")
+        if self.avatar is None:
+            return
+        import pyglet
+
+        skull = self._textures[f"skull-{self.team}"]
         batch = self.avatar.batch
         self.avatar.delete()
-        self.avatar = image_to_sprite(
-            img=av_image,
-            x=self.x,
-            y=self.y,
-            batch=batch,
-        )
+        self.avatar = pyglet.sprite.Sprite(img=skull, x=self.x, y=self.y, batch=batch)
+        hud_batch = self.score_avatar.batch
         self.score_avatar.delete()
-        self.score_avatar = image_to_sprite(
-            img=av_image,
-            x=config.nx + 30,
+        self.score_avatar = pyglet.sprite.Sprite(
+            img=skull,
+            x=config.view_nx + 30,
             y=config.ny - 100 - 75 * self.number,
-            batch=batch,
+            batch=hud_batch,
         )
-        print(f"Player {self.team} crashed! Reason: {reason}.")
 
-    def land(
-        self, time_left: float, landing_site_width: int, flag: Optional[str] = None
-    ):
+    def land(self, time_left: float, landing_site_width: int):
         self.landed = True
-        score_breakdown = {
+        self.landing_time = config.time_limit - time_left
+        self.score_breakdown = score_breakdown = {
             "landing": config.score_landing_bonus,
             "site width": config.score_landing_site_bonus
             * (config.avatar_size[0] / landing_site_width),
@@ -273,75 +339,39 @@ class Player:
             f"Player {self.team} landed! Score={self.score}: "
             + ", ".join([f"{k}={v:.1f}" for k, v in score_breakdown.items()])
         )
-        if flag is not None:
-            try:
-                img = Image.open(config.resources / "flags" / f"{flag}.png")
-            except FileNotFoundError:
-                img = Image.open(flag)
-            width = int(config.avatar_size[0] / 1.5)
-            height = int(width * (img.height / img.width))
-            img = img.resize((width, height)).convert("RGBA")
-            dx = config.avatar_size[0] // 5
+        if (self.flag is not None) and (self.avatar is not None):
+            import pyglet
 
+            flag = self._textures[f"flag-{self.team}"]
+            dx = config.avatar_size[0] // 5
             batch = self.avatar.batch
-            self.flag = image_to_sprite(
-                img=img,
-                x=self.avatar.x + dx,
-                y=self.avatar.y + dx,
-                batch=batch,
-                recenter=False,
+            self.flag_sprite = pyglet.sprite.Sprite(
+                img=flag, x=self.x + dx, y=self.y + dx, batch=batch
             )
-            self.score_flag = image_to_sprite(
-                img=img,
+            self.score_flag = pyglet.sprite.Sprite(
+                img=flag,
                 x=self.score_avatar.x + dx,
                 y=self.score_avatar.y + dx,
-                batch=batch,
-                recenter=False,
+                batch=self.score_avatar.batch,
             )
 
     def execute_bot_instructions(self, instructions: Optional[Instructions]):
         if instructions is None:
             return
-        self.main_thruster = instructions.main and self.flying
-        self.left_thruster = instructions.left and self.flying
-        self.right_thruster = instructions.right and self.flying
-
-    def update_scoreboard(self, batch: pyglet.graphics.Batch):
-        img = Image.new("RGBA", (150, 54), (0, 0, 0, 0))
+        flying = self.flying
+        self.main_thruster = instructions.main and flying
+        self.left_thruster = instructions.left and flying
+        self.right_thruster = instructions.right and flying
+
+    def update_scoreboard(self):
+        """
+        Refresh the text in the scoreboard. Only the lines whose displayed values
+        have changed are laid out again.
+        """
         texts = [
-            f"Team {self.team}",
             f"x={self.x:.1f}, y={self.y:.1f}",
             f"v=[{self.velocity[0]:.1f}, {self.velocity[1]:.1f}]",
             f"θ={self.heading:.1f}, fuel={self.fuel:.1f}",
         ]
-        for i, text in enumerate(texts):
-            img.paste(
-                text_to_raw_image(
-                    text,
-                    width=150,
-                    height=24,
-                    font=config.medium_font,
-                ),
-                (0, 14 * i),
-            )
-
-        if self.score_text is not None:
-            self.score_text.delete()
-        self.score_text = image_to_sprite(
-            img=img,
-            x=config.nx + 55,
-            y=config.ny - 120 - 75 * self.number,
-            batch=batch,
-            recenter=False,
-        )
-
-    def to_dict(self) -> dict:
-        return {
-            "team": self.team,
-            "position": (self.position[0], self.position[1]),
-            "velocity": (self.velocity[0], self.velocity[1]),
-            "heading": self.heading,
-            "fuel": self.fuel,
-            "dead": self.dead,
-            "landed": self.landed,
-        }
+        for line, text in zip(self.score_lines[1:], texts):
+            line.set_text(text)
@@ -0,0 +1,134 @@
+# SPDX-License-Identifier: BSD-3-Clause
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Tuple
+
+import numpy as np
+
+
+class _NullSection:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+_NULL_SECTION = _NullSection()
+
+
+class _Section:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler: "Profiler", name: str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *args):
+        self.profiler.record(self.name, self.start, time.perf_counter_ns())
+        return False
+
+
+class Profiler:
+    """
+    Timers for the sections of a frame (bots, physics, drawing, ...). When the
+    profiler is disabled, :meth:`section` returns a shared no-op context manager,
+    so that the instrumentation costs next to nothing.
+
+    The last ``window`` durations of every section are kept for rolling statistics
+    (see :meth:`stats`), and the last ``trace_size`` events can be exported as a
+    Chrome trace (see :meth:`export_chrome_trace`), to be opened in
+    ``chrome://tracing`` or Perfetto.
+    """
+
+    def __init__(
+        self, enabled: bool = False, window: int = 300, trace_size: int = 200_000
+    ):
+        self.enabled = enabled
+        self.window = window
+        self._durations: Dict[str, Deque[int]] = {}
+        self._counts: Dict[str, int] = {}
+        self._events: Deque[Tuple[str, int, int, int]] = deque(maxlen=trace_size)
+        self._origin = time.perf_counter_ns()
+
+    def section(self, name: str):
+        """
+        Time the code in a ``with`` block.
+        """
+        if not self.enabled:
+            return _NULL_SECTION
+        return _Section(self, name)
+
+    def record(self, name: str, start: int, end: int):
+        """
+        Record a section that ran between ``start`` and ``end`` (from
+        ``time.perf_counter_ns``).
+        """
+        durations = self._durations.get(name)
+        if durations is None:
+            durations = self._durations[name] = deque(maxlen=self.window)
+            self._counts[name] = 0
+        durations.append(end - start)
+        self._counts[name] += 1
+        self._events.append((name, start, end - start, threading.get_ident()))
+
+    def stats(self) -> Dict[str, dict]:
+        """
+        Statistics of the last ``window`` calls of every section, with times in
+        milliseconds.
+        """
+        out = {}
+        for name, durations in self._durations.items():
+            ms = np.array(durations) * 1.0e-6
+            out[name] = {
+                "calls": self._counts[name],
+                "mean": ms.mean(),
+                "p50": np.percentile(ms, 50),
+                "p95": np.percentile(ms, 95),
+                "max": ms.max(),
+            }
+        return out
+
+    def report(self) -> str:
+        """
+        Format the rolling statistics as a table, sorted by mean time.
+        """
+        stats = self.stats()
+        width = max([len(name) for name in stats] + [7])
+        lines = [
+            f"{'Section':<{width}}  {'calls':>7}  {'mean ms':>8}  {'p50 ms':>8}  "
+            f"{'p95 ms':>8}  {'max ms':>8}"
+        ]
+        for name, s in sorted(stats.items(), key=lambda item: -item[1]["mean"]):
+            lines.append(
+                f"{name:<{width}}  {s['calls']:>7}  {s['mean']:>8.3f}  "
+                f"{s['p50']:>8.3f}  {s['p95']:>8.3f}  {s['max']:>8.3f}"
+            )
+        return "\n".join(lines)
+
+    def export_chrome_trace(self, filename: str):
+        """
+        Write the recorded events to a file in the Chrome trace event format.
+        """
+        pid = os.getpid()
+        events = [
+            {
+                "name": name,
+                "ph": "X",
+                "ts": (start - self._origin) / 1000,
+                "dur": duration / 1000,
+                "pid": pid,
+                "tid": tid,
+            }
+            for name, start, duration, tid in self._events
+        ]
+        with open(filename, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
@@ -0,0 +1,121 @@
+# SPDX-License-Identifier: BSD-3-Clause
+
+import gzip
+import json
+import struct
+from typing import Optional, Tuple, Union
+
+import numpy as np
+
+MAGIC = b"LLREPLAY"
+VERSION = 1
+
+
+def _tick_dtype(nplayers: int) -> np.dtype:
+    # Three thruster flags per player, packed into bits
+    nbytes = (3 * nplayers + 7) // 8
+    return np.dtype([("t", "<f8"), ("dt", "<f8"), ("flags", "u1", (nbytes,))])
+
+
+class ReplayBot:
+    """
+    Stand-in for a bot during a replay. It carries the bot's team, avatar and flag,
+    but does not run any code: the instructions are read from the replay.
+    """
+
+    def __init__(self, team: str, avatar: Union[int, str] = 0, flag=None):
+        self.team = team
+        self.avatar = avatar
+        self.flag = flag
+
+    def run(self, **kwargs):
+        return None
+
+
+class ReplayWriter:
+    """
+    Record a game to a compressed binary file. The file starts with a header
+    describing the game (seed, players and options), followed by one record per
+    tick containing the time, the time step and the bit-packed thruster flags of
+    all players.
+    """
+
+    def __init__(self, filename: str, header: dict):
+        self.nplayers = len(header["teams"])
+        self._dtype = _tick_dtype(self.nplayers)
+        self._file = gzip.open(filename, "wb")
+        meta = json.dumps(header).encode("utf-8")
+        self._file.write(MAGIC + struct.pack("<HI", VERSION, len(meta)) + meta)
+
+    def write(self, t: float, dt: float, thrusters: np.ndarray):
+        record = np.empty(1, dtype=self._dtype)
+        record["t"] = t
+        record["dt"] = dt
+        record["flags"] = np.packbits(thrusters.ravel())
+        self._file.write(record.tobytes())
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+
+class Replay:
+    """
+    A recorded game, loaded from a file written by :class:`ReplayWriter`.
+    """
+
+    def __init__(self, filename: str):
+        with gzip.open(filename, "rb") as f:
+            data = f.read()
+        if data[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"{filename} is not a lunarlander replay file.")
+        offset = len(MAGIC)
+        version, size = struct.unpack_from("<HI", data, offset)
+        if version != VERSION:
+            raise ValueError(f"Unsupported replay file version: {version}.")
+        offset += struct.calcsize("<HI")
+        self.header = json.loads(data[offset : offset + size].decode("utf-8"))
+        offset += size
+
+        nplayers = len(self.header["teams"])
+        dtype = _tick_dtype(nplayers)
+        nticks = (len(data) - offset) // dtype.itemsize
+        records = np.frombuffer(data, dtype=dtype, count=nticks, offset=offset)
+        self.t = records["t"]
+        self.dt = records["dt"]
+        self.thrusters = (
+            np.unpackbits(records["flags"], axis=1, count=3 * nplayers)
+            .astype(bool)
+            .reshape(nticks, nplayers, 3)
+        )
+        self._tick = 0
+
+    def __len__(self) -> int:
+        return len(self.t)
+
+    @property
+    def seed(self) -> int:
+        return self.header["seed"]
+
+    @property
+    def options(self) -> dict:
+        return self.header["options"]
+
+    def make_bots(self) -> list:
+        return [
+            ReplayBot(team=team, avatar=avatar, flag=flag)
+            for team, avatar, flag in zip(
+                self.header["teams"], self.header["avatars"], self.header["flags"]
+            )
+        ]
+
+    def next_tick(self) -> Optional[Tuple[float, float, np.ndarray]]:
+        """
+        Return the time, time step and thruster flags of the next tick, or ``None``
+        if the end of the replay has been reached.
+        """
+        if self._tick >= len(self):
+            return None
+        i = self._tick
+        self._tick += 1
+        return self.t[i], self.dt[i], self.thrusters[i]
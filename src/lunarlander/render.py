@@ -0,0 +1,359 @@
+# SPDX-License-Identifier: BSD-3-Clause
+
+import datetime
+import os
+import queue
+import subprocess
+import threading
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from . import config
+from .images import avatar_image, flag_image, skull_image, sprite_images
+from .terrain import EARTH_POSITION
+
+# Size of the square images in which the landers (with their flames) are drawn
+# before being rotated
+LANDER_CANVAS = 96
+
+
+def blit(frame: np.ndarray, image: np.ndarray, x: int, y: int):
+    """
+    Blend an RGBA ``image`` into ``frame`` using its alpha channel, with the top
+    left corner of the image at column ``x`` and row ``y``. The parts of the image
+    outside the frame are left out. The alpha channel of the frame is updated too,
+    so that images can be layered on a transparent frame.
+    """
+    h, w = image.shape[:2]
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + w, frame.shape[1]), min(y + h, frame.shape[0])
+    if (x1 <= x0) or (y1 <= y0):
+        return
+    src = image[y0 - y : y1 - y, x0 - x : x1 - x]
+    dst = frame[y0:y1, x0:x1]
+    alpha = src[..., 3:].astype(np.uint32)
+    below = dst[..., 3:] * (255 - alpha) // 255
+    total = np.maximum(alpha + below, 1)
+    dst[..., :3] = (src[..., :3] * alpha + dst[..., :3] * below) // total
+    dst[..., 3:] = alpha + below
+
+
+def blit_anchored(
+    frame: np.ndarray,
+    image: np.ndarray,
+    x: float,
+    y: float,
+    anchor: Optional[Tuple[int, int]] = None,
+):
+    """
+    Blend an image into the frame like a sprite: the anchor of the image (from its
+    bottom left corner, defaulting to the center) is put at ``(x, y)``, with ``y``
+    going up from the bottom of the frame.
+    """
+    h, w = image.shape[:2]
+    ax, ay = (w // 2, h // 2) if anchor is None else anchor
+    blit(frame, image, int(round(x)) - ax, frame.shape[0] - int(round(y)) - (h - ay))
+
+
+def _rotate(image: np.ndarray, angle: float) -> np.ndarray:
+    """
+    Rotate an image counter-clockwise (in degrees) around its center.
+    """
+    from PIL import Image
+
+    return np.asarray(Image.fromarray(image).rotate(angle, resample=Image.BILINEAR))
+
+
+class FrameRenderer:
+    """
+    Draw the game into RGBA arrays, without a window or a GL context: the tiles of
+    the terrain background in view (see :class:`~lunarlander.camera.Camera`) are
+    copied into the frame, and the sprites are blended on top of them. The images of
+    the landers (for every thruster setting and whole degree of rotation) and of the
+    asteroids are made the first time they are needed and then reused.
+
+    The stars are not drawn.
+    """
+
+    def __init__(self, engine):
+        if not engine.game_map.has_background:
+            raise ValueError("The terrain of the game has no background.")
+        self.engine = engine
+        self.sprites = sprite_images()
+        self._teams = {}
+        for team, player in engine.players.items():
+            avatar = getattr(engine.bots[team], "avatar", 0)
+            flag = getattr(engine.bots[team], "flag", None)
+            self._teams[team] = {
+                "avatar": avatar_image(avatar, player.color),
+                "skull": skull_image(player.color),
+                "flag": None if flag is None else flag_image(flag),
+            }
+        self._landers: Dict[tuple, np.ndarray] = {}
+        self._asteroids: Dict[tuple, np.ndarray] = {}
+        self._scoreboard = None
+        self._texts: Dict[str, Tuple[tuple, np.ndarray]] = {}
+        self._time_of_last_scoreboard = None
+
+    def lander_image(self, team: str, thrusters: tuple, heading: float) -> np.ndarray:
+        """
+        The image of a lander with its flames, centered on the lander and rotated by
+        its heading.
+        """
+        key = (team, thrusters, int(round(heading)) % 360)
+        image = self._landers.get(key)
+        if image is None:
+            c = LANDER_CANVAS // 2
+            canvas = np.zeros((LANDER_CANVAS, LANDER_CANVAS, 4), dtype=np.uint8)
+            layers = [(self._teams[team]["avatar"], None)]
+            for name, on in zip(("main-flame", "left-flame", "right-flame"), thrusters):
+                if on:
+                    layers.append(self.sprites[name])
+            for layer, anchor in layers:
+                blit_anchored(canvas, layer, c, c, anchor)
+            image = self._landers[key] = _rotate(canvas, key[2])
+        return image
+
+    def asteroid_image(self, size: int, heading: float) -> np.ndarray:
+        key = (size, int(round(heading)) % 360)
+        image = self._asteroids.get(key)
+        if image is None:
+            from PIL import Image
+
+            asteroid = Image.fromarray(self.sprites["asteroid"][0]).resize((size, size))
+            image = self._asteroids[key] = _rotate(np.asarray(asteroid), key[1])
+        return image
+
+    def _draw_scoreboard(self, frame: np.ndarray, t: float):
+        """
+        Draw the scoreboard, which is refreshed (like in the game window) every
+        0.3 seconds of game time.
+        """
+        if (self._time_of_last_scoreboard is None) or (
+            abs(t - self._time_of_last_scoreboard) > 0.3
+        ):
+            self._time_of_last_scoreboard = t
+            panel = frame[:, config.view_nx :].copy()
+            left = str(datetime.timedelta(seconds=int(config.time_limit - t)))[2:]
+            text = self._text("time", (f"Time left: {left}",), config.large_font, 20)
+            blit(panel, text, 20, 6)
+            for player in self.engine.players.values():
+                images = self._teams[player.team]
+                y = config.ny - 100 - 75 * player.number
+                icon = images["skull"] if player.dead else images["avatar"]
+                blit_anchored(panel, icon, 30, y)
+                if player.landed and (images["flag"] is not None):
+                    dx = config.avatar_size[0] // 5
+                    blit_anchored(panel, images["flag"], 30 + dx, y + dx, (0, 0))
+                lines = (
+                    f"Team {player.team}",
+                    f"x={player.x:.1f}, y={player.y:.1f}",
+                    f"v=[{player.velocity[0]:.1f}, {player.velocity[1]:.1f}]",
+                    f"θ={player.heading:.1f}, fuel={player.fuel:.1f}",
+                )
+                text = self._text(player.team, lines, config.medium_font, 14)
+                blit(panel, text, 55, 66 + 75 * player.number)
+            self._scoreboard = panel
+        frame[:, config.view_nx :] = self._scoreboard
+
+    def _text(self, key: str, lines: tuple, font, spacing: int) -> np.ndarray:
+        """
+        Image of some lines of white text. The last image made for each ``key`` is
+        kept, so that the text is only drawn again when it changes.
+        """
+        cached = self._texts.get(key)
+        if (cached is not None) and (cached[0] == lines):
+            return cached[1]
+        from PIL import Image, ImageDraw
+
+        img = Image.new("RGBA", (config.scoreboard_width, spacing * (len(lines) + 1)))
+        draw = ImageDraw.Draw(img)
+        for i, line in enumerate(lines):
+            draw.text((0, spacing * i), line, fill=(255, 255, 255, 255), font=font)
+        image = np.asarray(img)
+        self._texts[key] = (lines, image)
+        return image
+
+    def render(self, t: Optional[float] = None) -> np.ndarray:
+        """
+        Draw the current state of the game, at game time ``t`` (defaults to the
+        time of the engine).
+        """
+        engine = self.engine
+        t = engine.sim_time if t is None else t
+        background = engine.game_map.background
+        if engine.headless:
+            # Nothing else uses the changed regions of the background
+            engine.game_map.dirty_regions.clear()
+        width = config.view_nx
+        frame = np.zeros((config.ny, width + config.scoreboard_width, 4), np.uint8)
+        left = engine.camera.left
+        for i, offset in background.visible(left, width):
+            tile = background.tile(i)
+            x0, x1 = max(offset, 0), min(offset + tile.shape[1], width)
+            frame[:, x0:x1] = tile[:, x0 - offset : x1 - offset]
+        blit(frame[:, :width], background.earth, *EARTH_POSITION)
+        frame[:, width:] = (20, 20, 20, 255)
+        self._draw_scoreboard(frame, t)
+
+        def screen_x(x):
+            # Position in the view, wrapping around the edges of the world
+            return (x - left + LANDER_CANVAS) % config.nx - LANDER_CANVAS
+
+        view = frame[:, :width]
+
+        landers = engine.landers
+        players = list(engine.players.values())
+        lem_background = self.sprites["lem-background"][0]
+        for x, y in landers.position:
+            blit_anchored(view, lem_background, screen_x(x), y)
+        asteroids = engine.asteroids
+        for (x, y), size, heading in zip(
+            asteroids.position[: len(asteroids)],
+            asteroids.size[: len(asteroids)],
+            asteroids.heading[: len(asteroids)],
+        ):
+            image = self.asteroid_image(int(size), heading)
+            blit_anchored(view, image, screen_x(x), y)
+        for i, player in enumerate(players):
+            x, y = landers.position[i]
+            x = screen_x(x)
+            images = self._teams[player.team]
+            if landers.dead[i]:
+                blit_anchored(view, images["skull"], x, y)
+                continue
+            thrusters = tuple(bool(on) for on in landers.thrusters[i])
+            if landers.landed[i]:
+                thrusters = (False, False, False)
+            image = self.lander_image(player.team, thrusters, landers.heading[i])
+            blit_anchored(view, image, x, y)
+            if landers.landed[i] and (images["flag"] is not None):
+                dx = config.avatar_size[0] // 5
+                blit_anchored(view, images["flag"], x + dx, y + dx, (0, 0))
+        return frame
+
+
+class FrameWriter:
+    """
+    Save frames in background threads, so that the game does not wait for the
+    images to be compressed.
+
+    Parameters
+    ----------
+    output:
+        A directory (a name without an extension), where the frames are saved as
+        numbered PNG files, or a video file, written by piping the frames into
+        ``ffmpeg`` (the format is given by the extension).
+    fps:
+        The frame rate of the video.
+    max_pending:
+        The number of frames that can wait to be saved. When the writer falls
+        behind, the game waits.
+    threads:
+        The number of threads compressing PNG files (the video encoder runs in its
+        own process). Defaults to the number of CPUs, up to 4.
+    """
+
+    def __init__(
+        self,
+        output: str,
+        fps: float,
+        max_pending: int = 16,
+        threads: Optional[int] = None,
+    ):
+        self.output = output
+        self.fps = fps
+        self.count = 0
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._error = None
+        self._encoder = None
+        self._png = os.path.splitext(output)[1] == ""
+        if self._png:
+            os.makedirs(output, exist_ok=True)
+            if threads is None:
+                threads = min(os.cpu_count() or 1, 4)
+        else:
+            # The frames must reach the encoder in order
+            threads = 1
+        self._threads = [
+            threading.Thread(target=self._run, daemon=True) for _ in range(threads)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def _start_encoder(self, frame: np.ndarray) -> subprocess.Popen:
+        height, width = frame.shape[:2]
+        return subprocess.Popen(
+            [
+                "ffmpeg",
+                "-loglevel",
+                "error",
+                "-y",
+                "-f",
+                "rawvideo",
+                "-pix_fmt",
+                "rgb24",
+                "-s",
+                f"{width}x{height}",
+                "-r",
+                f"{self.fps}",
+                "-i",
+                "-",
+                "-pix_fmt",
+                "yuv420p",
+                self.output,
+            ],
+            stdin=subprocess.PIPE,
+        )
+
+    def _save(self, index: int, frame: np.ndarray):
+        # The frames are opaque: the alpha channel is not saved
+        rgb = np.ascontiguousarray(frame[..., :3])
+        if self._png:
+            from PIL import Image
+
+            path = os.path.join(self.output, f"frame-{index:06d}.png")
+            Image.fromarray(rgb).save(path, compress_level=1)
+        else:
+            if self._encoder is None:
+                self._encoder = self._start_encoder(frame)
+            self._encoder.stdin.write(rgb.tobytes())
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            if self._error is None:
+                try:
+                    self._save(*item)
+                except Exception as error:
+                    self._error = error
+
+    def write(self, frame: np.ndarray):
+        """
+        Queue a frame to be saved. The frame must not be changed afterwards.
+        """
+        if self._error is not None:
+            raise RuntimeError("Saving the frames failed.") from self._error
+        self._queue.put((self.count, frame))
+        self.count += 1
+
+    def close(self):
+        """
+        Wait for all the frames to be saved.
+        """
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        if self._encoder is not None:
+            try:
+                self._encoder.stdin.close()
+            except OSError:
+                pass
+            if (self._encoder.wait() != 0) and (self._error is None):
+                self._error = RuntimeError("ffmpeg failed.")
+        if self._error is not None:
+            raise RuntimeError("Saving the frames failed.") from self._error
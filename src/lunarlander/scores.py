@@ -1,28 +1,247 @@
 # SPDX-License-Identifier: BSD-3-Clause
 
+import datetime
 import os
-from typing import Dict
+import sqlite3
+import tempfile
+from typing import Dict, List, Optional, Tuple
 
 from .player import Player
 
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rounds (
+    id INTEGER PRIMARY KEY,
+    label TEXT UNIQUE,
+    seed INTEGER,
+    finished TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS results (
+    round INTEGER NOT NULL REFERENCES rounds (id),
+    team TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    landed INTEGER NOT NULL,
+    crashed INTEGER NOT NULL,
+    PRIMARY KEY (round, team)
+);
+CREATE TABLE IF NOT EXISTS totals (
+    team TEXT PRIMARY KEY,
+    score INTEGER NOT NULL,
+    rounds INTEGER NOT NULL,
+    landings INTEGER NOT NULL
+);
+"""
 
-def read_scores(players: Dict[str, Player], test: bool) -> Dict[str, int]:
-    scores = {p: 0 for p in players}
-    fname = "scores.txt"
-    if os.path.exists(fname) and (not test):
-        with open(fname, "r") as f:
-            contents = f.readlines()
-        for line in contents:
-            name, score = line.split(":")
-            scores[name] = int(score.strip())
+
+class _Transaction:
+    """
+    Write transaction, which locks the database as soon as it starts so that the
+    totals cannot be changed by another process between reading and writing them.
+    """
+
+    def __init__(self, connection: sqlite3.Connection):
+        self.connection = connection
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.connection.execute("BEGIN IMMEDIATE")
+        return self.connection
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.connection.execute("COMMIT" if exc_type is None else "ROLLBACK")
+        return False
+
+
+class ScoreStore:
+    """
+    Scores of all the rounds of a tournament, in an SQLite database. The result of
+    every round is appended to the ``results`` table, and the totals per team are
+    updated in the same transaction, so that several games (in different processes)
+    can finish at the same time without losing any scores.
+
+    Rounds can be given a unique ``label``: a round with a label that was already
+    recorded is not counted twice.
+
+    Parameters
+    ----------
+    filename:
+        The database file. It is created if it does not exist.
+    import_from:
+        A ``scores.txt`` file with totals from an earlier version of the game. When
+        the database is created, these totals are imported as a first round.
+    timeout:
+        How long to wait for other processes writing to the database, in seconds.
+    """
+
+    def __init__(
+        self,
+        filename: str = "scores.db",
+        import_from: Optional[str] = None,
+        timeout: float = 60.0,
+    ):
+        self.filename = filename
+        self._connection = sqlite3.connect(
+            filename, timeout=timeout, isolation_level=None
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        with self._transaction() as db:
+            for statement in SCHEMA.split(";"):
+                if statement.strip():
+                    db.execute(statement)
+            empty = db.execute("SELECT COUNT(*) FROM rounds").fetchone()[0] == 0
+            if empty and (import_from is not None) and os.path.exists(import_from):
+                self._add_round(db, scores=read_scores(import_from), label=import_from)
+
+    def _transaction(self):
+        return _Transaction(self._connection)
+
+    def _add_round(
+        self,
+        db: sqlite3.Connection,
+        scores: Dict[str, int],
+        seed: Optional[int] = None,
+        label: Optional[str] = None,
+        landed: Optional[Dict[str, bool]] = None,
+        crashed: Optional[Dict[str, bool]] = None,
+    ) -> bool:
+        landed = {} if landed is None else landed
+        crashed = {} if crashed is None else crashed
+        if (label is not None) and db.execute(
+            "SELECT 1 FROM rounds WHERE label = ?", (label,)
+        ).fetchone():
+            return False
+        finished = datetime.datetime.now().isoformat(timespec="seconds")
+        round_id = db.execute(
+            "INSERT INTO rounds (label, seed, finished) VALUES (?, ?, ?)",
+            (label, seed, finished),
+        ).lastrowid
+        rows = [
+            (
+                team,
+                int(score),
+                int(landed.get(team, False)),
+                int(crashed.get(team, False)),
+            )
+            for team, score in scores.items()
+        ]
+        db.executemany(
+            "INSERT INTO results (round, team, score, landed, crashed) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [(round_id, *row) for row in rows],
+        )
+        db.executemany(
+            "INSERT INTO totals (team, score, rounds, landings) VALUES (?, ?, 1, ?) "
+            "ON CONFLICT (team) DO UPDATE SET score = score + excluded.score, "
+            "rounds = rounds + 1, landings = landings + excluded.landings",
+            [(team, score, landed) for team, score, landed, _ in rows],
+        )
+        return True
+
+    def add_round(
+        self,
+        scores: Dict[str, int],
+        seed: Optional[int] = None,
+        label: Optional[str] = None,
+        landed: Optional[Dict[str, bool]] = None,
+        crashed: Optional[Dict[str, bool]] = None,
+        totals_file: Optional[str] = None,
+    ) -> Dict[str, int]:
+        """
+        Record the scores of a round, and return the new totals of the teams that
+        took part in it.
+
+        If ``totals_file`` is given, the totals of all the teams are written to it
+        before the transaction ends, so that games finishing at the same time write
+        the file in the same order as they record their rounds, and the file never
+        ends up with older totals than the database.
+        """
+        with self._transaction() as db:
+            self._add_round(
+                db,
+                scores=scores,
+                seed=seed,
+                label=label,
+                landed=landed,
+                crashed=crashed,
+            )
+            totals = self._totals(db)
+            if totals_file is not None:
+                _write_scores(totals, fname=totals_file)
+        return {team: totals.get(team, 0) for team in scores}
+
+    def has_round(self, label: str) -> bool:
+        """
+        Whether a round with the given label was already recorded.
+        """
+        query = "SELECT 1 FROM rounds WHERE label = ?"
+        return self._connection.execute(query, (label,)).fetchone() is not None
+
+    def round_scores(self, label: str) -> Optional[Dict[str, int]]:
+        """
+        The scores of the round with the given label, or ``None`` if it was not
+        recorded.
+        """
+        rows = self._connection.execute(
+            "SELECT results.team, results.score FROM results "
+            "JOIN rounds ON rounds.id = results.round WHERE rounds.label = ?",
+            (label,),
+        ).fetchall()
+        return dict(rows) if rows else None
+
+    def _totals(self, db: sqlite3.Connection) -> Dict[str, int]:
+        return dict(db.execute("SELECT team, score FROM totals"))
+
+    def totals(self) -> Dict[str, int]:
+        """
+        The total score of every team.
+        """
+        return self._totals(self._connection)
+
+    def leaderboard(self) -> List[Tuple[str, int, int, int]]:
+        """
+        The teams sorted by total score, as ``(team, score, rounds, landings)``.
+        """
+        return self._connection.execute(
+            "SELECT team, score, rounds, landings FROM totals "
+            "ORDER BY score DESC, team"
+        ).fetchall()
+
+    def history(self, team: str) -> List[Tuple[int, Optional[str], int]]:
+        """
+        The scores of a team in every round, as ``(round, label, score)``.
+        """
+        return self._connection.execute(
+            "SELECT rounds.id, rounds.label, results.score FROM results "
+            "JOIN rounds ON rounds.id = results.round WHERE results.team = ? "
+            "ORDER BY rounds.id",
+            (team,),
+        ).fetchall()
+
+    def close(self):
+        self._connection.close()
+
+
+def read_scores(fname: str = "scores.txt") -> Dict[str, int]:
+    """
+    Read the totals from a ``scores.txt`` file.
+    """
+    scores = {}
+    with open(fname, "r") as f:
+        contents = f.readlines()
+    for line in contents:
+        name, score = line.rsplit(":", 1)
+        scores[name] = int(score.strip())
     return scores
 
 
-def _write_scores(scores: Dict[str, int]):
-    fname = "scores.txt"
-    with open(fname, "w") as f:
+def _write_scores(scores: Dict[str, int], fname: str = "scores.txt"):
+    """
+    Write the totals to a text file. The file is written to a temporary name and
+    then renamed, so that readers never see a partially written file.
+    """
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(fname)))
+    with os.fdopen(fd, "w") as f:
         for name, score in scores.items():
             f.write(f"{name}: {score}\n")
+    os.replace(tmp, fname)
 
 
 def _print_scores(round_scores: Dict[str, int], final_scores: Dict[str, int]):
@@ -35,9 +254,33 @@ def _print_scores(round_scores: Dict[str, int], final_scores: Dict[str, int]):
         print(f"{i + 1}. {name}: {total} (this round: {score})")
 
 
-def finalize_scores(players: Dict[str, Player], test: bool = False):
-    scores = read_scores(players, test=test)
+def finalize_scores(
+    players: Dict[str, Player],
+    test: bool = False,
+    seed: Optional[int] = None,
+    store: Optional[ScoreStore] = None,
+):
+    """
+    Print the scores of the round and the totals. Unless in test mode, the round
+    is added to the score store (``scores.db`` by default), and the totals are
+    written to ``scores.txt``.
+    """
     round_scores = {k: p.score for k, p in players.items()}
-    final_scores = {k: scores[k] + p.score for k, p in players.items()}
+    if test:
+        final_scores = round_scores
+    else:
+        own_store = store is None
+        if own_store:
+            store = ScoreStore("scores.db", import_from="scores.txt")
+        try:
+            final_scores = store.add_round(
+                round_scores,
+                seed=seed,
+                landed={k: p.landed for k, p in players.items()},
+                crashed={k: p.dead for k, p in players.items()},
+                totals_file="scores.txt",
+            )
+        finally:
+            if own_store:
+                store.close()
     _print_scores(round_scores=round_scores, final_scores=final_scores)
-    _write_scores(final_scores)
@@ -0,0 +1,224 @@
+# SPDX-License-Identifier: BSD-3-Clause
+
+from collections.abc import Mapping, Sequence
+from typing import Any, Dict, Iterator, List, Tuple
+
+import numpy as np
+
+
+def _frozen(array: np.ndarray) -> np.ndarray:
+    out = np.array(array)
+    out.flags.writeable = False
+    return out
+
+
+class PlayerView:
+    """
+    Information about a player, read from a :class:`Snapshot`. It has the same
+    attributes as :class:`~lunarlander.tools.PlayerInfo`.
+    """
+
+    __slots__ = ("_snapshot", "_index", "team")
+
+    def __init__(self, snapshot: "Snapshot", index: int, team: str):
+        self._snapshot = snapshot
+        self._index = index
+        self.team = team
+
+    @property
+    def position(self) -> Tuple[float, float]:
+        position = self._snapshot.position
+        return (position[self._index, 0], position[self._index, 1])
+
+    @property
+    def velocity(self) -> Tuple[float, float]:
+        velocity = self._snapshot.velocity
+        return (velocity[self._index, 0], velocity[self._index, 1])
+
+    @property
+    def heading(self) -> float:
+        return self._snapshot.heading[self._index]
+
+    @property
+    def fuel(self) -> float:
+        return self._snapshot.fuel[self._index]
+
+    @property
+    def dead(self) -> bool:
+        return bool(self._snapshot.dead[self._index])
+
+    @property
+    def landed(self) -> bool:
+        return bool(self._snapshot.landed[self._index])
+
+    def __getitem__(self, key: str) -> Any:
+        return getattr(self, key)
+
+    def __repr__(self) -> str:
+        return (
+            f"PlayerView(team={self.team!r}, position={self.position}, "
+            f"velocity={self.velocity}, heading={self.heading}, fuel={self.fuel}, "
+            f"dead={self.dead}, landed={self.landed})"
+        )
+
+
+class AsteroidView:
+    """
+    Information about an asteroid, read from a :class:`Snapshot`. It has the same
+    attributes as :class:`~lunarlander.tools.AsteroidInfo`.
+    """
+
+    __slots__ = ("_snapshot", "_index")
+
+    def __init__(self, snapshot: "Snapshot", index: int):
+        self._snapshot = snapshot
+        self._index = index
+
+    @property
+    def id(self) -> str:
+        return self._snapshot.asteroid_ids[self._index]
+
+    @property
+    def position(self) -> Tuple[float, float]:
+        position = self._snapshot.asteroid_position
+        return (position[self._index, 0], position[self._index, 1])
+
+    @property
+    def velocity(self) -> Tuple[float, float]:
+        velocity = self._snapshot.asteroid_velocity
+        return (velocity[self._index, 0], velocity[self._index, 1])
+
+    @property
+    def heading(self) -> float:
+        return self._snapshot.asteroid_heading[self._index]
+
+    @property
+    def size(self) -> float:
+        return self._snapshot.asteroid_size[self._index]
+
+    def __getitem__(self, key: str) -> Any:
+        return getattr(self, key)
+
+    def __repr__(self) -> str:
+        return (
+            f"AsteroidView(id={self.id!r}, position={self.position}, "
+            f"velocity={self.velocity}, heading={self.heading}, size={self.size})"
+        )
+
+
+class PlayerViews(Mapping):
+    """
+    Mapping from team name to :class:`PlayerView`. The views are only made when
+    they are first looked up.
+    """
+
+    def __init__(self, snapshot: "Snapshot"):
+        self._snapshot = snapshot
+        self._views: Dict[str, PlayerView] = {}
+
+    def __getitem__(self, team: str) -> PlayerView:
+        view = self._views.get(team)
+        if view is None:
+            index = self._snapshot.team_index[team]
+            view = self._views[team] = PlayerView(self._snapshot, index, team)
+        return view
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._snapshot.teams)
+
+    def __len__(self) -> int:
+        return len(self._snapshot.teams)
+
+
+class AsteroidViews(Sequence):
+    """
+    Sequence of :class:`AsteroidView`, made when they are first accessed.
+    """
+
+    def __init__(self, snapshot: "Snapshot"):
+        self._snapshot = snapshot
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(len(self))[i]]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("asteroid index out of range")
+        return AsteroidView(self._snapshot, i)
+
+    def __len__(self) -> int:
+        return len(self._snapshot.asteroid_ids)
+
+
+class Snapshot:
+    """
+    The state of the world at one tick, as seen by the bots. It is made of a few
+    read-only arrays (one row per player or asteroid), copied once per tick, so that
+    a snapshot kept by a bot never changes. Making a snapshot costs a few array
+    copies, which grow with the number of players and asteroids, instead of one
+    object per player and asteroid. The information about single players and
+    asteroids is only read from the arrays when a bot asks for it (see
+    :meth:`to_info`).
+
+    The terrain is a read-only array, which is shared by all the snapshots until a
+    crater changes the terrain (``terrain_version`` is then increased).
+    """
+
+    def __init__(
+        self,
+        t: float,
+        dt: float,
+        terrain: np.ndarray,
+        terrain_version: int,
+        teams: List[str],
+        team_index: Dict[str, int],
+        position: np.ndarray,
+        velocity: np.ndarray,
+        heading: np.ndarray,
+        fuel: np.ndarray,
+        dead: np.ndarray,
+        landed: np.ndarray,
+        asteroid_ids: List[str],
+        asteroid_position: np.ndarray,
+        asteroid_velocity: np.ndarray,
+        asteroid_heading: np.ndarray,
+        asteroid_size: np.ndarray,
+    ):
+        self.t = t
+        self.dt = dt
+        self.terrain = terrain
+        self.terrain_version = terrain_version
+        self.teams = teams
+        self.team_index = team_index
+        self.position = _frozen(position)
+        self.velocity = _frozen(velocity)
+        self.heading = _frozen(heading)
+        self.fuel = _frozen(fuel)
+        self.dead = _frozen(dead)
+        self.landed = _frozen(landed)
+        self.asteroid_ids = tuple(asteroid_ids)
+        self.asteroid_position = _frozen(asteroid_position)
+        self.asteroid_velocity = _frozen(asteroid_velocity)
+        self.asteroid_heading = _frozen(asteroid_heading)
+        self.asteroid_size = _frozen(asteroid_size)
+
+    @property
+    def players(self) -> PlayerViews:
+        return PlayerViews(self)
+
+    @property
+    def asteroids(self) -> AsteroidViews:
+        return AsteroidViews(self)
+
+    def to_info(self) -> dict:
+        """
+        The information passed on to the bots' ``run`` method.
+        """
+        return {
+            "t": self.t,
+            "dt": self.dt,
+            "terrain": self.terrain,
+            "players": self.players,
+            "asteroids": self.asteroids,
+        }
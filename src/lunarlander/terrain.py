@@ -1,64 +1,265 @@
 # SPDX-License-Identifier: BSD-3-Clause
-from functools import reduce
+
+from __future__ import annotations
+
+import bisect
+from collections import OrderedDict
+from typing import List, Optional, Tuple
 
 import numpy as np
-import pyglet
-from PIL import Image
-from scipy.ndimage import gaussian_filter
 
 from . import config
+from .images import load_image
 
+# Top left corner of the Earth in the view: it is too far away to move with the view
+EARTH_POSITION = (1400, 100)
 
-class Terrain:
-    def __init__(self):
-        profile = np.zeros([config.nx])
-        nseeds = 100
-        xseed = np.random.randint(config.nx, size=nseeds)
-        profile[xseed] = 10000 * np.random.random(nseeds)
-        self.smooth = gaussian_filter(profile, sigma=30, mode="wrap")
-        self.terrain = self.smooth.copy()
-        self.landing_sites = np.zeros_like(self.terrain)
-
-        img = Image.open(config.resources / "lunar-surface.png")
-        if (img.width != config.nx) or (img.height != config.ny):
-            img = img.resize((config.nx, config.ny))
-        img = img.convert("RGBA")
-        data = img.getdata()
-        self.raw_background = (
-            np.array(data).reshape(img.height, img.width, 4).astype(np.uint8)
-        )
-        self.current_background = np.full(
-            (config.ny, config.nx + config.scoreboard_width, 4), 20, dtype=np.uint8
-        )
-        self.current_background[..., 3] = 255
-        self.current_background[:, : config.nx, :] = self.raw_background
-        self.y_map = np.broadcast_to(
-            config.ny - np.arange(config.ny).reshape(config.ny, 1),
-            (config.ny, config.nx),
+
+def smooth_periodic(profile: np.ndarray, sigma: float) -> np.ndarray:
+    """
+    Smooth a periodic profile with a Gaussian kernel, truncated at 4 standard
+    deviations (as ``scipy.ndimage.gaussian_filter`` with ``mode="wrap"``).
+    """
+    radius = int(4 * sigma + 0.5)
+    x = np.arange(-radius, radius + 1)
+    kernel = np.exp(-0.5 * (x / sigma) ** 2)
+    kernel /= kernel.sum()
+    padded = np.take(profile, np.arange(-radius, len(profile) + radius), mode="wrap")
+    return np.convolve(padded, kernel, mode="valid")
+
+
+class LandingSites:
+    """
+    Run-length index of the flat stretches of terrain. ``width[i]`` is the width of
+    the flat site that contains column ``i``. When part of the terrain changes, only
+    the runs that touch the modified columns are merged or split, and a view of the
+    sites sorted by decreasing width is kept up to date.
+    """
+
+    def __init__(self, terrain: np.ndarray):
+        self.terrain = terrain
+        n = len(terrain)
+        self.width = np.zeros(n, dtype=int)
+        self.start = np.zeros(n, dtype=int)
+        starts, lengths = self._index(0, n)
+        self.runs = dict(zip(starts, lengths))
+        self._sorted = sorted(zip([-length for length in lengths], starts))
+
+    def _index(self, lo: int, hi: int) -> Tuple[List[int], List[int]]:
+        """
+        Find the runs of equal values in ``terrain[lo:hi]`` and fill in their widths.
+        """
+        segment = self.terrain[lo:hi]
+        run_start = np.empty(len(segment), dtype=bool)
+        run_start[0] = True
+        np.not_equal(segment[:-1], segment[1:], out=run_start[1:])
+        starts = np.flatnonzero(run_start)
+        lengths = np.diff(np.append(starts, len(segment)))
+        starts += lo
+        self.width[lo:hi] = np.repeat(lengths, lengths)
+        self.start[lo:hi] = np.repeat(starts, lengths)
+        return starts.tolist(), lengths.tolist()
+
+    def update(self, lo: int, hi: int):
+        """
+        Update the index after the values in ``terrain[lo:hi]`` have changed.
+        """
+        n = len(self.terrain)
+        # Extend the span to the runs on either side, which may merge with the
+        # modified columns (or were split by them)
+        if lo > 0:
+            lo = self.start[lo - 1]
+        if hi < n:
+            hi = self.start[hi] + self.width[hi]
+        start = lo
+        while start < hi:
+            length = self.runs.pop(start)
+            del self._sorted[bisect.bisect_left(self._sorted, (-length, start))]
+            start += length
+        for start, length in zip(*self._index(lo, hi)):
+            self.runs[start] = length
+            bisect.insort(self._sorted, (-length, start))
+
+    def widest(self, count: int = 1) -> List[Tuple[int, int]]:
+        """
+        The ``count`` widest flat sites, as ``(start, width)`` tuples.
+        """
+        return [(start, -length) for length, start in self._sorted[:count]]
+
+
+class Footprints:
+    """
+    Lowest and highest terrain under every possible lander footprint:
+    ``min[i]`` and ``max[i]`` are the extremes of the ``width`` columns starting at
+    column ``i``, wrapping around the right edge. When part of the terrain changes,
+    only the footprints that overlap the modified columns are recomputed.
+    """
+
+    def __init__(self, terrain: np.ndarray, width: int):
+        self.terrain = terrain
+        self.width = width
+        n = len(terrain)
+        self.min = np.empty(n)
+        self.max = np.empty(n)
+        self._compute(0, n)
+
+    def _compute(self, lo: int, hi: int):
+        n = len(self.terrain)
+        columns = np.arange(lo, hi + self.width - 1) % n
+        windows = np.lib.stride_tricks.sliding_window_view(
+            self.terrain[columns], self.width
         )
+        windows.min(axis=1, out=self.min[lo:hi])
+        windows.max(axis=1, out=self.max[lo:hi])
 
-        self.update_background(slice(0, config.nx), slice(0, config.ny))
+    def update(self, lo: int, hi: int):
+        """
+        Update the tables after the values in ``terrain[lo:hi]`` have changed.
+        """
+        n = len(self.terrain)
+        lo -= self.width - 1
+        if lo < 0:
+            self._compute(max(n + lo, hi), n)
+            lo = 0
+        self._compute(lo, hi)
 
-        # Add Earth rise
-        earth = Image.open(config.resources / "earth.png").convert("RGBA")
-        earth_data = earth.getdata()
-        earth_array = (
-            np.array(earth_data).reshape(earth.height, earth.width, 4).astype(np.uint8)
+
+class Background:
+    """
+    Image of the terrain: the lunar surface below the terrain profile, and an empty
+    (transparent) sky above it. The image is stored as tiles of
+    ``config.tile_size`` columns, which are only made when they are first needed
+    (i.e. when they come into view), and of which only the ``capacity`` most
+    recently used are kept, so that the memory does not grow with the width of the
+    world. Tiles that were dropped are made again from the terrain when needed.
+
+    The first ground row of every column is kept, so that a change in the terrain
+    only touches the pixels between the old and the new ground level.
+    """
+
+    def __init__(self, terrain: np.ndarray, capacity: Optional[int] = None):
+        self.terrain = terrain
+        self.surface = load_image(
+            config.resources / "lunar-surface.png", size=(config.view_nx, config.ny)
         )
-        earth_x = 1400
-        earth_y = 100
-        self.current_background[
-            earth_y : earth_y + earth_array.shape[0],
-            earth_x : earth_x + earth_array.shape[1],
-            :,
-        ] = earth_array
-        self.background_image = self.terrain_to_image()
-
-    def update_background(self, xslice: slice, yslice: slice) -> None:
-        raw = self.raw_background[yslice, xslice]
-        mask = (self.y_map[yslice, xslice] < self.terrain[xslice]).astype(int)
-        mask = mask.reshape(mask.shape + (1,))
-        self.current_background[yslice, xslice] = raw * mask
+        self.earth = load_image(config.resources / "earth.png")
+        self.tile_size = config.tile_size
+        self.ntiles = -(-len(terrain) // self.tile_size)
+        if capacity is None:
+            # Enough tiles to cover the view twice
+            capacity = 2 * (-(-config.view_nx // self.tile_size) + 1)
+        self.capacity = capacity
+        self._tiles = OrderedDict()
+        self._ground = self._ground_rows(0, len(terrain))
+
+    def _ground_rows(self, x0: int, x1: int) -> np.ndarray:
+        """
+        The first row (from the top) of ground in the columns ``x0:x1``: the pixels
+        in row ``r`` are ground where ``ny - r < terrain``.
+        """
+        rows = np.floor(config.ny - self.terrain[x0:x1]).astype(int) + 1
+        return np.clip(rows, 0, config.ny)
+
+    def columns(self, i: int) -> Tuple[int, int]:
+        """
+        The first and last (excluded) column of tile ``i``.
+        """
+        x0 = i * self.tile_size
+        return x0, min(x0 + self.tile_size, len(self.terrain))
+
+    def tile(self, i: int) -> np.ndarray:
+        """
+        The RGBA image of tile ``i``, made if it is not in memory.
+        """
+        tile = self._tiles.get(i)
+        if tile is None:
+            tile = self._tiles[i] = self._make_tile(i)
+            if len(self._tiles) > self.capacity:
+                self._tiles.popitem(last=False)
+        else:
+            self._tiles.move_to_end(i)
+        return tile
+
+    def _make_tile(self, i: int) -> np.ndarray:
+        x0, x1 = self.columns(i)
+        tile = np.zeros((config.ny, x1 - x0, 4), dtype=np.uint8)
+        # The surface texture is repeated along worlds wider than the view
+        width = self.surface.shape[1]
+        for j, row in enumerate(self._ground[x0:x1]):
+            tile[row:, j] = self.surface[row:, (x0 + j) % width]
+        return tile
+
+    def update(self, x0: int, x1: int) -> Tuple[int, int]:
+        """
+        Update the tiles in memory after ``terrain[x0:x1]`` has changed, and return
+        the first and last (excluded) rows that changed.
+        """
+        old = self._ground[x0:x1].copy()
+        new = self._ground_rows(x0, x1)
+        self._ground[x0:x1] = new
+        width = self.surface.shape[1]
+        for i in range(x0 // self.tile_size, -(-x1 // self.tile_size)):
+            tile = self._tiles.get(i)
+            if tile is None:
+                continue
+            t0, t1 = self.columns(i)
+            for x in range(max(x0, t0), min(x1, t1)):
+                a, b = old[x - x0], new[x - x0]
+                if b > a:
+                    tile[a:b, x - t0] = 0
+                elif b < a:
+                    tile[b:a, x - t0] = self.surface[b:a, x % width]
+        return int(min(old.min(), new.min())), int(max(old.max(), new.max()))
+
+    def visible(self, x: int, width: int) -> List[Tuple[int, int]]:
+        """
+        The tiles in view when the left edge of the view is at column ``x``, as
+        ``(tile, offset)`` tuples, where ``offset`` is the position of the left edge
+        of the tile in the view. The view wraps around the right edge of the world.
+        """
+        nx = len(self.terrain)
+        x %= nx
+        i = x // self.tile_size
+        offset = i * self.tile_size - x
+        tiles = []
+        while offset < width:
+            tiles.append((i, offset))
+            x0, x1 = self.columns(i)
+            offset += x1 - x0
+            i = (i + 1) % self.ntiles
+        return tiles
+
+
+class Terrain:
+    def __init__(
+        self, rng: Optional[np.random.RandomState] = None, background: bool = True
+    ):
+        if rng is None:
+            rng = np.random.RandomState()
+        profile = np.zeros([config.nx])
+        # As many hills for every 1720 columns as on the original map
+        nseeds = max(int(round(100 * config.nx / 1720)), 1)
+        xseed = rng.randint(config.nx, size=nseeds)
+        profile[xseed] = 10000 * rng.random_sample(nseeds)
+
+        # The smoothing is cheap (well under a millisecond), so the profiles are not
+        # cached: there would be one per seed
+        self.smooth = smooth_periodic(profile, sigma=30)
+        self.terrain = self.smooth.copy()
+        # Increased every time a crater changes the terrain
+        self.version = 0
+        self._frozen = None
+        self.sites = LandingSites(self.terrain)
+        self.landing_sites = self.sites.width
+        self.footprints = Footprints(self.terrain, width=config.avatar_size[0])
+        self.background = Background(self.terrain) if background else None
+        # Regions of the background that changed since the textures were last
+        # updated, as (x0, x1, y0, y1) with the rows counted from the top
+        self.dirty_regions = []
+
+    @property
+    def has_background(self) -> bool:
+        return self.background is not None
 
     def make_crater(self, x: int, scaling: float = 1.0) -> None:
         r = int(round(config.crater_radius * scaling))
@@ -72,35 +273,33 @@ class Terrain:
             slices.append(slice(None, end - config.nx))
             end = config.nx
         slices.append(slice(start, end))
-        y_val = reduce(min, [self.terrain[sl].min() for sl in slices])
-        yslice = slice(200, config.ny - int(y_val))
         for xslice in slices:
             self.terrain[xslice] = float(self.terrain[x])
-            self.update_background(xslice, yslice)
-        self.background_image = self.terrain_to_image()
-        self.update_landing_sites()
+            x0, x1, _ = xslice.indices(config.nx)
+            self.update_landing_sites(x0, x1)
+            self.footprints.update(x0, x1)
+            if self.has_background:
+                y0, y1 = self.background.update(x0, x1)
+                if y1 > y0:
+                    self.dirty_regions.append((x0, x1, y0, y1))
+        self.version += 1
 
-    def update_landing_sites(self):
-        # Find largest landing site
-        n = len(self.terrain)
-        # Find run starts
-        loc_run_start = np.empty(n, dtype=bool)
-        loc_run_start[0] = True
-        np.not_equal(self.terrain[:-1], self.terrain[1:], out=loc_run_start[1:])
-        run_starts = np.nonzero(loc_run_start)[0]
-
-        # Find run lengths
-        run_lengths = np.diff(np.append(run_starts, n))
-
-        for start, length in zip(run_starts, run_lengths):
-            self.landing_sites[start : start + length] = length
-
-    def terrain_to_image(self) -> Image:
-        img = Image.fromarray(self.current_background)
-        return pyglet.image.ImageData(
-            width=img.width,
-            height=img.height,
-            fmt="RGBA",
-            data=img.tobytes(),
-            pitch=-img.width * 4,
-        )
+    def frozen_terrain(self) -> np.ndarray:
+        """
+        A read-only copy of the terrain heights. The same copy is returned until a
+        crater changes the terrain.
+        """
+        if (self._frozen is None) or (self._frozen[0] != self.version):
+            terrain = self.terrain.copy()
+            terrain.flags.writeable = False
+            self._frozen = (self.version, terrain)
+        return self._frozen[1]
+
+    def update_landing_sites(self, start: int = 0, end: Optional[int] = None):
+        """
+        Update the landing site widths after ``terrain[start:end]`` has changed.
+        """
+        self.sites.update(start, len(self.terrain) if end is None else end)
+
+    def widest_landing_sites(self, count: int = 1) -> List[Tuple[int, int]]:
+        return self.sites.widest(count)
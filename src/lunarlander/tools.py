@@ -1,13 +1,15 @@
 # SPDX-License-Identifier: BSD-3-Clause
 
-from dataclasses import dataclass
-from typing import Any, Optional, Tuple
+from __future__ import annotations
 
-import pyglet
-from PIL import Image, ImageDraw, ImageFont
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Tuple
 
 from . import config
 
+if TYPE_CHECKING:
+    import pyglet
+
 
 @dataclass
 class Instructions:
@@ -54,59 +56,38 @@ class AsteroidInfo:
         return getattr(self, key)
 
 
-def text_to_raw_image(
-    text: str, width: float, height: float, font: Optional[ImageFont.ImageFont] = None
-) -> Image:
-    if font is None:
-        font = config.large_font
-    img = Image.new("RGBA", (width, height), (0, 0, 0, 0))
-    d = ImageDraw.Draw(img)
-    d.text(
-        (0, 0),
-        text,
-        fill=(255, 255, 255),
-        font=font,
-    )
-    return img
-
-
-def text_to_image(
-    text: str, width: float, height: float, font: Optional[ImageFont.ImageFont] = None
-) -> pyglet.image.ImageData:
-    img = text_to_raw_image(text, width, height, font=font)
-    return pyglet.image.ImageData(
-        width=img.width,
-        height=img.height,
-        fmt="RGBA",
-        data=img.tobytes(),
-        pitch=-img.width * 4,
-    )
-
-
-def recenter_image(img: pyglet.image.ImageData) -> pyglet.image.ImageData:
-    img.anchor_x = img.width // 2
-    img.anchor_y = img.height // 2
-    return img
-
-
-def image_to_sprite(
-    img: Image,
-    x: float,
-    y: float,
-    batch: pyglet.graphics.Batch,
-    recenter: bool = True,
-    anchor: Optional[Tuple[float, float]] = None,
-) -> pyglet.sprite.Sprite:
-    imd = pyglet.image.ImageData(
-        width=img.width,
-        height=img.height,
-        fmt="RGBA",
-        data=img.tobytes(),
-        pitch=-img.width * 4,
-    )
-    if anchor is not None:
-        imd.anchor_x = anchor[0]
-        imd.anchor_y = anchor[1]
-    elif recenter:
-        imd = recenter_image(imd)
-    return pyglet.sprite.Sprite(img=imd, x=x, y=y, batch=batch)
+class TextLine:
+    """
+    A line of text on the screen, drawn with a persistent label. The text is only
+    laid out again when the displayed string changes.
+    """
+
+    def __init__(
+        self,
+        x: float,
+        y: float,
+        batch: pyglet.graphics.Batch,
+        text: str = "",
+        font_size: float = 9,
+    ):
+        import pyglet
+
+        self.text = text
+        self.label = pyglet.text.Label(
+            text,
+            font_name=config.font_name,
+            font_size=font_size,
+            x=x,
+            y=y,
+            anchor_y="top",
+            color=(255, 255, 255, 255),
+            batch=batch,
+        )
+
+    def set_text(self, text: str):
+        if text != self.text:
+            self.text = text
+            self.label.text = text
+
+    def delete(self):
+        self.label.delete()
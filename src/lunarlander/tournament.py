@@ -0,0 +1,259 @@
+# SPDX-License-Identifier: BSD-3-Clause
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .batch import _play_game
+from .cache import make_key
+from .scores import ScoreStore
+
+
+@dataclass(frozen=True)
+class Game:
+    """
+    A game in a tournament: the teams of one heat, playing one seed.
+    """
+
+    stage: str
+    heat: int
+    seed: int
+    teams: Tuple[str, ...]
+
+    @property
+    def label(self) -> str:
+        """
+        Unique name of the game, used to find out if it was already played.
+        """
+        key = make_key(sorted(self.teams))[:8]
+        return f"{self.stage}/heat{self.heat}/seed{self.seed}/{key}"
+
+
+def split_heats(teams: Sequence[str], heat_size: int) -> List[List[str]]:
+    """
+    Split the teams into as few heats as possible, with at most ``heat_size`` teams
+    each, and sizes that differ by at most one.
+    """
+    nheats = -(-len(teams) // heat_size)
+    return [list(heat) for heat in np.array_split(list(teams), nheats)]
+
+
+def seeded_heats(ranking: Sequence[str], heat_size: int) -> List[List[str]]:
+    """
+    Split ranked teams into heats, going back and forth over the heats (the best
+    team goes to the first heat, the second to the second heat, ..., and the last
+    heat also gets the next team), so that the heats are equally strong.
+    """
+    nheats = -(-len(ranking) // heat_size)
+    heats = [[] for _ in range(nheats)]
+    for i, team in enumerate(ranking):
+        turn, pos = divmod(i, nheats)
+        heats[pos if turn % 2 == 0 else nheats - 1 - pos].append(team)
+    return heats
+
+
+def round_robin(
+    teams: Sequence[str],
+    heat_size: int,
+    seeds: Sequence[int],
+    rounds: int = 1,
+    draw_seed: int = 0,
+) -> List[Game]:
+    """
+    Schedule ``rounds`` rounds, in which the teams are drawn into heats of at most
+    ``heat_size`` teams, and every heat plays one game per seed. Each round has a
+    new draw, so that the teams meet different opponents. With a ``heat_size`` of
+    at least the number of teams, all the teams play all the seeds together.
+
+    The draws only depend on ``draw_seed``, so that the same games are scheduled
+    when an interrupted tournament is resumed.
+    """
+    rng = np.random.RandomState(draw_seed)
+    games = []
+    for r in range(rounds):
+        heats = split_heats(rng.permutation(list(teams)).tolist(), heat_size)
+        for h, heat in enumerate(heats):
+            games += [Game(f"round{r}", h, seed, tuple(heat)) for seed in seeds]
+    return games
+
+
+class Tournament:
+    """
+    Play the games of a tournament over a pool of processes, saving the result of
+    every game to a :class:`~lunarlander.scores.ScoreStore` as soon as it
+    finishes. Games that are already in the store are not played again, so that an
+    interrupted tournament can be resumed by running it again.
+
+    Parameters
+    ----------
+    bots:
+        The bots taking part in the tournament. They must be picklable.
+    store:
+        The score store, or the name of its database file.
+    processes:
+        The number of worker processes. Defaults to the number of CPUs.
+    quiet:
+        Silence the messages printed by the engine and the bots during the games.
+    **kwargs:
+        Additional game options passed on to the :class:`Engine`.
+    """
+
+    def __init__(
+        self,
+        bots: list,
+        store: Union[ScoreStore, str] = "tournament.db",
+        processes: Optional[int] = None,
+        quiet: bool = True,
+        **kwargs,
+    ):
+        self.bots = {bot.team: bot for bot in bots}
+        self.store = ScoreStore(store) if isinstance(store, str) else store
+        self.processes = processes
+        self.quiet = quiet
+        self.options = kwargs
+
+    @property
+    def teams(self) -> List[str]:
+        return list(self.bots)
+
+    def _task(self, game: Game) -> tuple:
+        bots = [self.bots[team] for team in game.teams]
+        return (bots, game.seed, self.quiet, self.options)
+
+    def _record(self, game: Game, rows: np.ndarray):
+        self.store.add_round(
+            {row["team"]: int(row["score"]) for row in rows},
+            seed=game.seed,
+            label=game.label,
+            landed={row["team"]: bool(row["landed"]) for row in rows},
+            crashed={row["team"]: bool(row["crashed"]) for row in rows},
+        )
+
+    def play(self, games: Sequence[Game]):
+        """
+        Play the games that are not in the store yet, and save their results. A game
+        that fails does not stop the others: the error is raised once all the other
+        games are saved, and the failed games are played again on the next run.
+        """
+        todo = [game for game in games if not self.store.has_round(game.label)]
+        if len(todo) < len(games):
+            print(f"Skipping {len(games) - len(todo)} games that were already played")
+        failed = []
+        if self.processes == 1:
+            for game in todo:
+                try:
+                    rows = _play_game(self._task(game))
+                except Exception as error:
+                    failed.append((game, error))
+                    continue
+                self._record(game, rows)
+        else:
+            with ProcessPoolExecutor(max_workers=self.processes) as pool:
+                futures = {
+                    pool.submit(_play_game, self._task(game)): game for game in todo
+                }
+                try:
+                    for future in as_completed(futures):
+                        try:
+                            rows = future.result()
+                        except Exception as error:
+                            failed.append((futures[future], error))
+                            continue
+                        self._record(futures[future], rows)
+                except BaseException:
+                    # Keep the results saved so far, and stop the games not started
+                    for future in futures:
+                        future.cancel()
+                    raise
+        if failed:
+            game, error = failed[0]
+            raise RuntimeError(
+                f"{len(failed)} games failed, the first one was {game.label}"
+            ) from error
+
+    def scores(self, games: Sequence[Game]) -> Dict[str, int]:
+        """
+        The sum of the scores of every team over the given (played) games.
+        """
+        totals = {}
+        for game in games:
+            for team, score in self.store.round_scores(game.label).items():
+                totals[team] = totals.get(team, 0) + score
+        return totals
+
+    def play_round_robin(
+        self,
+        heat_size: int,
+        seeds: Sequence[int],
+        rounds: int = 1,
+        draw_seed: int = 0,
+    ) -> List[Tuple[str, int]]:
+        """
+        Play the games scheduled by :func:`round_robin`, and return the teams sorted
+        by their total score over these games.
+        """
+        games = round_robin(
+            self.teams, heat_size, seeds=seeds, rounds=rounds, draw_seed=draw_seed
+        )
+        self.play(games)
+        scores = self.scores(games)
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+    def play_bracket(
+        self,
+        heat_size: int,
+        seeds: Sequence[int],
+        advance: int = 2,
+        ranking: Optional[Sequence[str]] = None,
+    ) -> List[Tuple[str, int]]:
+        """
+        Play an elimination bracket. The teams are split into seeded heats (see
+        :func:`seeded_heats`), every heat plays one game per seed, and the best
+        ``advance`` teams of each heat (by their total score over the seeds) go on
+        to the next stage, until all the remaining teams fit in a single final
+        heat. Return the teams of the final, sorted by their score in it.
+
+        Parameters
+        ----------
+        heat_size:
+            The largest number of teams in a heat.
+        seeds:
+            The seeds played by every heat.
+        advance:
+            The number of teams that go on to the next stage from each heat.
+        ranking:
+            The teams, from the strongest to the weakest (e.g. from an earlier
+            round robin). Defaults to the order of the bots.
+        """
+        if not 0 < advance < heat_size:
+            raise ValueError("The number of teams advancing must be below heat_size.")
+        teams = list(self.teams if ranking is None else ranking)
+        stage = 0
+        while True:
+            heats = seeded_heats(teams, heat_size)
+            games = [
+                Game(f"bracket{stage}", h, seed, tuple(heat))
+                for h, heat in enumerate(heats)
+                for seed in seeds
+            ]
+            self.play(games)
+            results = []
+            for h, heat in enumerate(heats):
+                scores = self.scores([game for game in games if game.heat == h])
+                ranked = sorted(heat, key=lambda team: -scores[team])
+                results.append([(team, scores[team]) for team in ranked])
+            if len(heats) == 1:
+                return results[0]
+            # Heat winners are seeded first in the next stage, then the runners-up...
+            qualified = sorted(
+                (place, -score, team)
+                for result in results
+                for place, (team, score) in enumerate(result[:advance])
+            )
+            if len(qualified) == len(teams):
+                # The heats are too small to eliminate anyone: go to the final
+                qualified = qualified[:heat_size]
+            teams = [team for _, _, team in qualified]
+            stage += 1
@@ -0,0 +1,353 @@
+# SPDX-License-Identifier: BSD-3-Clause
+
+import multiprocessing
+import time
+import traceback
+from multiprocessing import connection, shared_memory
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from . import config
+from .snapshot import Snapshot
+from .tools import Instructions
+
+
+def _world_dtype(nplayers: int, capacity: int) -> np.dtype:
+    return np.dtype(
+        [
+            ("t", "f8"),
+            ("dt", "f8"),
+            ("terrain_version", "i8"),
+            ("terrain", "f8", (config.nx,)),
+            ("position", "f8", (nplayers, 2)),
+            ("velocity", "f8", (nplayers, 2)),
+            ("heading", "f8", (nplayers,)),
+            ("fuel", "f8", (nplayers,)),
+            ("dead", "?", (nplayers,)),
+            ("landed", "?", (nplayers,)),
+            ("nasteroids", "i8"),
+            ("asteroid_id", "U32", (capacity,)),
+            ("asteroid_position", "f8", (capacity, 2)),
+            ("asteroid_velocity", "f8", (capacity, 2)),
+            ("asteroid_heading", "f8", (capacity,)),
+            ("asteroid_size", "f8", (capacity,)),
+        ]
+    )
+
+
+class SharedWorld:
+    """
+    The state of the world seen by the bots, stored as structured records in a block
+    of shared memory. The engine writes a :class:`Snapshot` into one of the records
+    (the slots) once per tick, and the worker processes copy it out into a
+    :class:`Snapshot`. The terrain is only copied when it changes.
+
+    There are several slots, so that the engine never writes a tick into a slot that
+    a worker is still copying (see :class:`BotPool`). Bots can keep the snapshot of
+    a tick, as it does not share any memory with the slot.
+
+    The asteroids have a fixed capacity. When there are more asteroids than fit in
+    the block, the engine moves to a larger block (see :meth:`resized`).
+    """
+
+    def __init__(
+        self,
+        nplayers: int,
+        capacity: int = 64,
+        nslots: int = 2,
+        name: Optional[str] = None,
+    ):
+        self.nplayers = nplayers
+        self.capacity = capacity
+        self.nslots = nslots
+        dtype = _world_dtype(nplayers, capacity)
+        self.owner = name is None
+        self.shm = shared_memory.SharedMemory(
+            name=name, create=self.owner, size=dtype.itemsize * nslots
+        )
+        self.record = np.ndarray((nslots,), dtype=dtype, buffer=self.shm.buf)
+        if self.owner:
+            self.record["terrain_version"] = -1
+        self._terrain = None
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def resized(self, capacity: int) -> "SharedWorld":
+        """
+        Return a new, larger world in a new block of shared memory, and release this
+        one.
+        """
+        world = SharedWorld(
+            nplayers=self.nplayers, capacity=capacity, nslots=self.nslots
+        )
+        self.close()
+        return world
+
+    def write(self, snapshot: Snapshot, slot: int = 0):
+        rec = self.record[slot, ...]
+        rec["t"] = snapshot.t
+        rec["dt"] = snapshot.dt
+        # The terrain only needs to be copied when a crater changed it
+        if rec["terrain_version"] != snapshot.terrain_version:
+            rec["terrain"] = snapshot.terrain
+            rec["terrain_version"] = snapshot.terrain_version
+        rec["position"] = snapshot.position
+        rec["velocity"] = snapshot.velocity
+        rec["heading"] = snapshot.heading
+        rec["fuel"] = snapshot.fuel
+        rec["dead"] = snapshot.dead
+        rec["landed"] = snapshot.landed
+        n = len(snapshot.asteroid_ids)
+        rec["nasteroids"] = n
+        if n > 0:
+            rec["asteroid_id"][:n] = snapshot.asteroid_ids
+            rec["asteroid_position"][:n] = snapshot.asteroid_position
+            rec["asteroid_velocity"][:n] = snapshot.asteroid_velocity
+            rec["asteroid_heading"][:n] = snapshot.asteroid_heading
+            rec["asteroid_size"][:n] = snapshot.asteroid_size
+
+    def read(self, teams: List[str], slot: int = 0) -> Snapshot:
+        """
+        Make a snapshot of the world from a slot of the shared memory, with copies
+        of the arrays of the slot. The read-only copy of the terrain is kept until
+        the terrain version changes.
+        """
+        rec = self.record[slot, ...]
+        version = int(rec["terrain_version"])
+        if (self._terrain is None) or (self._terrain[0] != version):
+            terrain = rec["terrain"].copy()
+            terrain.flags.writeable = False
+            self._terrain = (version, terrain)
+        n = int(rec["nasteroids"])
+        return Snapshot(
+            t=float(rec["t"]),
+            dt=float(rec["dt"]),
+            terrain=self._terrain[1],
+            terrain_version=version,
+            teams=teams,
+            team_index={team: i for i, team in enumerate(teams)},
+            position=rec["position"],
+            velocity=rec["velocity"],
+            heading=rec["heading"],
+            fuel=rec["fuel"],
+            dead=rec["dead"],
+            landed=rec["landed"],
+            asteroid_ids=[str(i) for i in rec["asteroid_id"][:n]],
+            asteroid_position=rec["asteroid_position"][:n],
+            asteroid_velocity=rec["asteroid_velocity"][:n],
+            asteroid_heading=rec["asteroid_heading"][:n],
+            asteroid_size=rec["asteroid_size"][:n],
+        )
+
+    def close(self):
+        # Drop the views into the buffer before closing it
+        self.record = None
+        try:
+            self.shm.close()
+        except BufferError:
+            # A bot is still holding on to a view (e.g. of the terrain): the memory
+            # is released when the view is garbage collected
+            pass
+        if self.owner:
+            self.shm.unlink()
+
+
+def _worker_main(
+    conn,
+    bots: dict,
+    teams: List[str],
+    name: str,
+    capacity: int,
+    nslots: int,
+    safe: bool,
+):
+    """
+    Main loop of a worker process: for each tick, read the world from shared memory
+    and run the requested bots on it. The answer of each bot is sent back as soon as
+    it is ready, along with the time the bot took.
+    """
+    world = SharedWorld(
+        nplayers=len(teams), capacity=capacity, nslots=nslots, name=name
+    )
+    try:
+        while True:
+            message = conn.recv()
+            if message is None:
+                break
+            tick, slot, active, resize = message
+            if resize is not None:
+                world.close()
+                world = SharedWorld(
+                    nplayers=len(teams),
+                    capacity=resize[1],
+                    nslots=nslots,
+                    name=resize[0],
+                )
+            info = world.read(teams, slot=slot).to_info()
+            for team in active:
+                start = time.perf_counter()
+                try:
+                    instructions = bots[team].run(**info)
+                except Exception:
+                    if not safe:
+                        conn.send(("error", team, traceback.format_exc()))
+                        return
+                    instructions = None
+                latency = time.perf_counter() - start
+                conn.send(("result", tick, team, instructions, latency))
+            conn.send(("done", tick))
+    finally:
+        world.close()
+
+
+class BotPool:
+    """
+    Run the bots in a pool of worker processes. Each bot lives in one worker for the
+    whole game (so that bots can keep state between ticks), and the workers run
+    their bots concurrently. The time taken by a tick is then set by the slowest
+    worker, instead of the sum of the time taken by all the bots.
+
+    With a time budget, the engine waits at most ``budget`` seconds per bot for the
+    workers to answer. Answers that arrive later are discarded, and a worker that is
+    still busy with a previous tick is skipped (its bots keep their previous
+    instructions) until it has caught up. Bots sharing a worker run one after the
+    other, so a slow bot can also delay the others in its worker.
+
+    The world is published in one more slot of shared memory than there are
+    workers, and every tick goes to a slot that no busy worker is reading, so that
+    a late worker never sees a tick being written over the one it is reading.
+
+    The bots are copied to the workers when the pool starts, and must be picklable
+    if the platform does not fork processes.
+    """
+
+    def __init__(
+        self,
+        bots: Dict[str, object],
+        teams: List[str],
+        workers: int,
+        safe: bool = False,
+    ):
+        self.teams = teams
+        self.tick = 0
+        names = list(bots)
+        workers = max(1, min(workers, len(names)))
+        self.world = SharedWorld(nplayers=len(teams), nslots=workers + 1)
+        ctx = multiprocessing.get_context()
+        self.groups = [set(names[i::workers]) for i in range(workers)]
+        self.connections = []
+        self.processes = []
+        for group in self.groups:
+            parent_conn, child_conn = ctx.Pipe()
+            process = ctx.Process(
+                target=_worker_main,
+                args=(
+                    child_conn,
+                    {team: bots[team] for team in group},
+                    teams,
+                    self.world.name,
+                    self.world.capacity,
+                    self.world.nslots,
+                    safe,
+                ),
+                daemon=True,
+            )
+            process.start()
+            child_conn.close()
+            self.connections.append(parent_conn)
+            self.processes.append(process)
+        # Whether each worker is still running bots, and the world and slot it last
+        # read
+        self.busy = [False] * workers
+        self.worlds = [self.world.name] * workers
+        self.slots = [0] * workers
+        self._results = []
+
+    def _receive(self, worker: int):
+        message = self.connections[worker].recv()
+        if message[0] == "error":
+            raise RuntimeError(f"Bot {message[1]} raised an exception:\n{message[2]}")
+        if message[0] == "done":
+            self.busy[worker] = False
+        else:
+            _, tick, team, instructions, latency = message
+            self._results.append((team, instructions, latency, tick == self.tick))
+
+    def run(
+        self,
+        snapshot: Snapshot,
+        active: List[str],
+        budget: Optional[float] = None,
+    ) -> List[Tuple[str, Optional[Instructions], float, bool]]:
+        """
+        Publish the state of the world and run the bots of the ``active`` teams.
+
+        Return a ``(team, instructions, latency, on_time)`` tuple for every answer
+        received, where ``on_time`` is ``False`` for late answers to previous ticks.
+        """
+        self.tick += 1
+        # Collect the late answers to previous ticks
+        for i, conn in enumerate(self.connections):
+            while self.busy[i] and conn.poll():
+                self._receive(i)
+
+        nasteroids = len(snapshot.asteroid_ids)
+        if nasteroids > self.world.capacity:
+            capacity = self.world.capacity
+            while capacity < nasteroids:
+                capacity *= 2
+            self.world = self.world.resized(capacity)
+        # There is always a slot left, as each busy worker reads a single slot
+        reading = {slot for slot, busy in zip(self.slots, self.busy) if busy}
+        slot = min(set(range(self.world.nslots)) - reading)
+        self.world.write(snapshot, slot=slot)
+
+        pending = {}
+        nmax = 0
+        for i, (conn, group) in enumerate(zip(self.connections, self.groups)):
+            teams = [team for team in active if team in group]
+            if (not teams) or self.busy[i]:
+                continue
+            resize = None
+            if self.worlds[i] != self.world.name:
+                resize = (self.world.name, self.world.capacity)
+                self.worlds[i] = self.world.name
+            conn.send((self.tick, slot, teams, resize))
+            self.busy[i] = True
+            self.slots[i] = slot
+            pending[conn] = i
+            nmax = max(nmax, len(teams))
+
+        deadline = None if budget is None else time.perf_counter() + budget * nmax
+        while pending:
+            timeout = (
+                None if deadline is None else max(deadline - time.perf_counter(), 0)
+            )
+            ready = connection.wait(list(pending), timeout=timeout)
+            if not ready:
+                break
+            for conn in ready:
+                i = pending[conn]
+                self._receive(i)
+                if not self.busy[i]:
+                    del pending[conn]
+
+        results, self._results = self._results, []
+        return results
+
+    def close(self):
+        for conn in self.connections:
+            try:
+                conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self.processes:
+            process.join(timeout=1)
+            if process.is_alive():
+                process.terminate()
+        for conn in self.connections:
+            conn.close()
+        self.world.close()
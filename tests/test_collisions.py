@@ -0,0 +1,92 @@
+# SPDX-License-Identifier: BSD-3-Clause
+
+import contextlib
+import io
+
+import numpy as np
+import pytest
+
+from lunarlander import Engine, config
+from lunarlander.collisions import close_pairs, periodic_dx
+
+PERIOD = 1000.0
+RADIUS = 30.0
+
+
+def brute_force_pairs(position: np.ndarray, radius: float, period: float) -> list:
+    pairs = []
+    for i in range(len(position)):
+        for j in range(i):
+            dx = periodic_dx(position[i, 0] - position[j, 0], period)
+            dist = np.hypot(dx, position[i, 1] - position[j, 1])
+            if 0 < dist < radius:
+                pairs.append((i, j))
+    return pairs
+
+
+@pytest.mark.parametrize("n", [0, 1, 2, 10, 32, 33, 300])
+def test_close_pairs_match_brute_force(n):
+    rng = np.random.RandomState(n)
+    position = np.column_stack([rng.uniform(0, PERIOD, n), rng.uniform(0, 200, size=n)])
+    i, j = close_pairs(position, radius=RADIUS, period=PERIOD)
+    assert list(zip(i, j)) == brute_force_pairs(position, RADIUS, PERIOD)
+
+
+def test_close_pairs_across_the_edges():
+    rng = np.random.RandomState(1)
+    # Crowded near both edges, with x outside of [0, period) and points on top of
+    # each other
+    x = np.concatenate(
+        [rng.uniform(-20, 40, 40), rng.uniform(960, 1020, 40), [5.0, 5.0, 1005.0]]
+    )
+    position = np.column_stack([x, rng.uniform(0, 60, len(x))])
+    position[-3:, 1] = 10.0
+    i, j = close_pairs(position, radius=RADIUS, period=PERIOD)
+    expected = brute_force_pairs(position, RADIUS, PERIOD)
+    assert len(expected) > 0
+    assert list(zip(i, j)) == expected
+
+
+class Idle:
+    def __init__(self, team: str):
+        self.team = team
+
+    def run(self, **kwargs):
+        return None
+
+
+def make_engine(nplayers: int) -> Engine:
+    with contextlib.redirect_stdout(io.StringIO()):
+        return Engine(
+            bots=[Idle(f"bot{i}") for i in range(nplayers)],
+            seed=0,
+            headless=True,
+            write_scores=False,
+        )
+
+
+def test_collision_of_a_pair_exchanges_normal_velocities():
+    engine = make_engine(2)
+    landers = engine.landers
+    # Across the right edge of the map
+    landers.position[:] = [[config.nx - 5.0, 500.0], [5.0, 500.0]]
+    landers.velocity[:] = [[10.0, 3.0], [-20.0, -1.0]]
+    engine.compute_collisions()
+    np.testing.assert_allclose(landers.velocity, [[-20.0, 3.0], [10.0, -1.0]])
+
+
+def test_collisions_conserve_momentum():
+    engine = make_engine(60)
+    landers = engine.landers
+    rng = np.random.RandomState(3)
+    # A crowd, in which some landers touch several others at once
+    landers.position[:] = np.column_stack(
+        [rng.uniform(-75, 75, 60) % config.nx, rng.uniform(400, 450, 60)]
+    )
+    landers.velocity[:] = rng.normal(0, 20, (60, 2))
+    landers.dead[0] = True
+    before = landers.velocity.copy()
+    engine.compute_collisions()
+    np.testing.assert_array_equal(landers.velocity[0], before[0])
+    assert not np.allclose(landers.velocity, before)
+    np.testing.assert_allclose(landers.velocity.sum(axis=0), before.sum(axis=0))
@@ -0,0 +1,106 @@
+# SPDX-License-Identifier: BSD-3-Clause
+
+import contextlib
+import io
+
+import numpy as np
+import pytest
+
+from lunarlander import Engine, VectorEnv
+from lunarlander.env import ExternalBot
+
+SEEDS = [1, 2, 3]
+
+
+def random_actions(nsteps: int, shape: tuple, seed: int = 0) -> np.ndarray:
+    rng = np.random.RandomState(seed)
+    return rng.random_sample((nsteps,) + shape + (3,)) < [0.45, 0.1, 0.1]
+
+
+def play(env: VectorEnv, actions: np.ndarray) -> list:
+    steps = [env.reset(seeds=SEEDS)]
+    for action in actions:
+        obs, rewards, dones, info = env.step(action)
+        steps.append((obs, rewards, dones, info["game_over"]))
+    return steps
+
+
+def assert_same(a, b):
+    if isinstance(a, dict):
+        assert a.keys() == b.keys()
+        for key in a:
+            np.testing.assert_array_equal(a[key], b[key], err_msg=key)
+    elif isinstance(a, (tuple, list)):
+        assert len(a) == len(b)
+        for x, y in zip(a, b):
+            assert_same(x, y)
+    else:
+        np.testing.assert_array_equal(a, b)
+
+
+@pytest.fixture(scope="module")
+def actions():
+    return random_actions(1500, (len(SEEDS), 2))
+
+
+def test_reset_and_step_are_deterministic(actions):
+    env = VectorEnv(num_envs=len(SEEDS), teams=2, crash_reward=-1.0)
+    first = play(env, actions)
+    # Again in the same environment, and in a new one
+    assert_same(play(env, actions), first)
+    other = VectorEnv(num_envs=len(SEEDS), teams=2, crash_reward=-1.0)
+    assert_same(play(other, actions), first)
+    # All the players finished
+    assert first[-1][2].all()
+    rewards = sum(step[1] for step in first[1:])
+    assert (rewards != 0).all()
+
+
+def test_reset_leaves_the_global_random_state_alone():
+    env = VectorEnv(num_envs=2)
+    np.random.seed(123)
+    expected = np.random.random_sample(5)
+    np.random.seed(123)
+    env.reset(seeds=[4, 5])
+    env.step(np.ones((2, 1, 3), dtype=bool))
+    np.testing.assert_array_equal(np.random.random_sample(5), expected)
+
+
+def test_games_match_single_engines(actions):
+    env = VectorEnv(num_envs=len(SEEDS), teams=["a", "b"], copy=False)
+    env.reset(seeds=SEEDS)
+    with contextlib.redirect_stdout(io.StringIO()):
+        engines = [
+            Engine(
+                bots=[ExternalBot("a"), ExternalBot("b")],
+                seed=seed,
+                headless=True,
+                write_scores=False,
+            )
+            for seed in SEEDS
+        ]
+        for action in actions:
+            obs, _, _, info = env.step(action)
+            for engine, thrusters in zip(engines, action):
+                if not engine.exiting:
+                    engine.step(thrusters=thrusters)
+    for i, engine in enumerate(engines):
+        np.testing.assert_array_equal(obs["position"][i], engine.landers.position)
+        np.testing.assert_array_equal(obs["fuel"][i], engine.landers.fuel)
+        np.testing.assert_array_equal(obs["terrain"][i], engine.game_map.terrain)
+        assert obs["t"][i] == engine.sim_time
+        assert info["game_over"][i] == engine.exiting
+
+
+def test_terrain_is_only_copied_when_it_changes():
+    env = VectorEnv(num_envs=2)
+    first = env.reset(seeds=[1, 2])
+    assert not first["terrain"].flags.writeable
+    obs, _, _, _ = env.step(np.zeros((2, 1, 3), dtype=bool))
+    assert obs["terrain"] is first["terrain"]
+    assert obs["position"] is not first["position"]
+    env.engines[1].game_map.make_crater(x=100)
+    obs, _, _, _ = env.step(np.zeros((2, 1, 3), dtype=bool))
+    assert obs["terrain"] is not first["terrain"]
+    np.testing.assert_array_equal(obs["terrain"][1], env.engines[1].game_map.terrain)
+    np.testing.assert_array_equal(obs["terrain"][0], first["terrain"][0])
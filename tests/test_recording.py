@@ -0,0 +1,89 @@
+# SPDX-License-Identifier: BSD-3-Clause
+
+import contextlib
+import gzip
+import io
+
+import numpy as np
+import pytest
+
+import lunarlander
+from lunarlander import Engine, Instructions, Replay, config
+
+
+class Pilot:
+    """
+    Bot that fires its main engine when falling too fast, and keeps upright apart
+    from a short turn now and then, so that the thrusters change often during a
+    long game.
+    """
+
+    def __init__(self, team: str, period: float):
+        self.team = team
+        self.period = period
+
+    def run(self, t, dt, terrain, players, asteroids):
+        me = players[self.team]
+        instructions = Instructions()
+        instructions.main = me.velocity[1] < -5
+        if (t % self.period) < 0.2:
+            instructions.left = True
+        elif me.heading < -2:
+            instructions.left = True
+        elif me.heading > 2:
+            instructions.right = True
+        return instructions
+
+
+def final_state(engine: Engine) -> dict:
+    return {
+        team: (
+            float(p.x),
+            float(p.y),
+            float(p.heading),
+            float(p.fuel),
+            p.dead,
+            p.landed,
+            p.score,
+            p.crash_reason,
+        )
+        for team, p in engine.players.items()
+    }
+
+
+def test_replay_round_trip_with_substeps(tmp_path):
+    filename = str(tmp_path / "game.lrec")
+    bots = [Pilot(f"pilot{i}", period=1.0 + 0.7 * i) for i in range(4)]
+    with contextlib.redirect_stdout(io.StringIO()):
+        game = Engine(
+            bots=bots,
+            seed=11,
+            headless=True,
+            write_scores=False,
+            record=filename,
+            substeps=3,
+            crater_scaling=2.0,
+        )
+        game.run()
+        replay = Replay(filename)
+        replayed = lunarlander.replay(filename, headless=True)
+
+    assert replay.seed == 11
+    assert replay.options["substeps"] == 3
+    assert replay.options["crater_scaling"] == 2.0
+    assert len(replay) == game.steps
+    np.testing.assert_allclose(np.diff(replay.t), 1.0 / (3 * config.fps))
+    assert replay.thrusters.any()
+    # Asteroids made craters, which changed where the landers touch the ground
+    assert game.game_map.version > 0
+    assert replayed.steps == game.steps
+    assert final_state(replayed) == final_state(game)
+    np.testing.assert_array_equal(replayed.game_map.terrain, game.game_map.terrain)
+
+
+def test_replay_rejects_other_files(tmp_path):
+    filename = tmp_path / "notareplay.lrec"
+    with gzip.open(filename, "wb") as f:
+        f.write(b"something else")
+    with pytest.raises(ValueError, match="not a lunarlander replay"):
+        Replay(str(filename))
@@ -0,0 +1,77 @@
+# SPDX-License-Identifier: BSD-3-Clause
+
+import contextlib
+import io
+from concurrent.futures import ProcessPoolExecutor
+from types import SimpleNamespace
+
+from lunarlander.scores import ScoreStore, finalize_scores, read_scores
+
+NROUNDS = 25
+
+
+def add_rounds(filename: str, writer: int) -> None:
+    store = ScoreStore(filename, timeout=30.0)
+    try:
+        for r in range(NROUNDS):
+            store.add_round(
+                {"shared": 1, f"team{writer}": r},
+                label=f"writer{writer}/round{r}",
+                landed={"shared": True},
+            )
+            # Both writers also try to record the same rounds: only one is kept
+            store.add_round({"shared": 100}, label=f"common/round{r}")
+    finally:
+        store.close()
+
+
+def test_two_writers(tmp_path):
+    filename = str(tmp_path / "scores.db")
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        for future in [pool.submit(add_rounds, filename, w) for w in range(2)]:
+            future.result()
+    store = ScoreStore(filename)
+    expected = sum(range(NROUNDS))
+    assert store.totals() == {
+        "shared": 2 * NROUNDS + 100 * NROUNDS,
+        "team0": expected,
+        "team1": expected,
+    }
+    assert store.leaderboard()[0] == ("shared", 102 * NROUNDS, 3 * NROUNDS, 50)
+    assert len(store.history("shared")) == 3 * NROUNDS
+    assert store.round_scores("writer1/round3") == {"shared": 1, "team1": 3}
+    store.close()
+
+
+def test_two_connections_see_each_others_rounds(tmp_path):
+    filename = str(tmp_path / "scores.db")
+    first = ScoreStore(filename)
+    second = ScoreStore(filename)
+    assert first.add_round({"a": 5, "b": 1}, label="one") == {"a": 5, "b": 1}
+    assert second.has_round("one")
+    assert second.add_round({"a": 2}, label="two") == {"a": 7}
+    assert second.add_round({"a": 2}, label="two") == {"a": 7}
+    assert first.totals() == {"a": 7, "b": 1}
+    first.close()
+    second.close()
+
+
+def players(**scores) -> dict:
+    return {
+        team: SimpleNamespace(score=score, landed=score > 0, dead=score == 0)
+        for team, score in scores.items()
+    }
+
+
+def test_finalize_scores_writes_the_totals(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "scores.txt").write_text("a: 10\nold: 3\n")
+    with contextlib.redirect_stdout(io.StringIO()) as output:
+        finalize_scores(players(a=5, b=0))
+        finalize_scores(players(a=1, b=2))
+    # The totals of the first version of the game were imported
+    assert read_scores("scores.txt") == {"a": 16, "old": 3, "b": 2}
+    assert "1. a: 16 (this round: 1)" in output.getvalue()
+    with contextlib.redirect_stdout(io.StringIO()):
+        finalize_scores(players(a=100), test=True)
+    assert read_scores("scores.txt") == {"a": 16, "old": 3, "b": 2}
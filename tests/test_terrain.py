@@ -0,0 +1,70 @@
+# SPDX-License-Identifier: BSD-3-Clause
+
+import numpy as np
+import pytest
+
+from lunarlander import config
+from lunarlander.terrain import Footprints, LandingSites, Terrain, smooth_periodic
+
+
+@pytest.fixture
+def terrain():
+    return Terrain(rng=np.random.RandomState(1), background=False)
+
+
+def crater_positions(seed: int = 2, count: int = 40) -> list:
+    # Craters anywhere, and across both edges of the map
+    rng = np.random.RandomState(seed)
+    return [0, 3, config.nx - 1, config.nx - 5] + list(
+        rng.randint(config.nx, size=count)
+    )
+
+
+def test_landing_sites_widths():
+    terrain = np.array([1.0, 1.0, 2.0, 3.0, 3.0, 3.0, 1.0])
+    sites = LandingSites(terrain)
+    np.testing.assert_array_equal(sites.width, [2, 2, 1, 3, 3, 3, 1])
+    np.testing.assert_array_equal(sites.start, [0, 0, 2, 3, 3, 3, 6])
+    assert sites.widest(2) == [(3, 3), (0, 2)]
+
+
+@pytest.mark.parametrize("scaling", [0.5, 1.0, 3.0])
+def test_landing_sites_after_craters_match_a_rebuild(terrain, scaling):
+    for x in crater_positions():
+        terrain.make_crater(x=int(x), scaling=scaling)
+        rebuilt = LandingSites(terrain.terrain.copy())
+        np.testing.assert_array_equal(terrain.sites.width, rebuilt.width)
+        np.testing.assert_array_equal(terrain.sites.start, rebuilt.start)
+        assert terrain.sites.runs == rebuilt.runs
+        assert terrain.widest_landing_sites(10) == rebuilt.widest(10)
+    assert terrain.landing_sites is terrain.sites.width
+
+
+def test_footprints_wrap_around_the_edge():
+    terrain = np.array([5.0, 1.0, 2.0, 4.0, 3.0])
+    footprints = Footprints(terrain, width=3)
+    np.testing.assert_array_equal(footprints.min, [1, 1, 2, 3, 1])
+    np.testing.assert_array_equal(footprints.max, [5, 4, 4, 5, 5])
+
+
+@pytest.mark.parametrize("scaling", [0.5, 1.0, 3.0])
+def test_footprints_after_craters_match_a_rebuild(terrain, scaling):
+    for x in crater_positions():
+        terrain.make_crater(x=int(x), scaling=scaling)
+        rebuilt = Footprints(terrain.terrain.copy(), width=config.avatar_size[0])
+        np.testing.assert_array_equal(terrain.footprints.min, rebuilt.min)
+        np.testing.assert_array_equal(terrain.footprints.max, rebuilt.max)
+
+
+@pytest.mark.parametrize("n", [50, 1720])
+def test_smooth_periodic_matches_scipy(n):
+    ndimage = pytest.importorskip("scipy.ndimage")
+    rng = np.random.RandomState(n)
+    profile = np.zeros(n)
+    profile[rng.randint(n, size=10)] = 10000 * rng.random_sample(10)
+    np.testing.assert_allclose(
+        smooth_periodic(profile, sigma=30),
+        ndimage.gaussian_filter(profile, sigma=30, mode="wrap"),
+        rtol=0,
+        atol=1e-9,
+    )
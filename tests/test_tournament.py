@@ -0,0 +1,123 @@
+# SPDX-License-Identifier: BSD-3-Clause
+
+import pytest
+
+import lunarlander.tournament
+from lunarlander import Instructions
+from lunarlander.tournament import Tournament, round_robin
+
+TEAMS = ["ada", "bob", "cyd", "dan"]
+SEEDS = [1, 2]
+
+
+class Faller:
+    """
+    Bot that slows its fall down, but soon crashes, so that games are short.
+    """
+
+    def __init__(self, team: str, limit: float):
+        self.team = team
+        self.limit = limit
+
+    def run(self, t, dt, terrain, players, asteroids):
+        instructions = Instructions()
+        instructions.main = players[self.team].velocity[1] < -self.limit
+        return instructions
+
+
+class Broken(Faller):
+    """
+    Bot that raises an error while ``failing`` is set, e.g. to interrupt a
+    tournament.
+    """
+
+    failing = False
+
+    def run(self, **kwargs):
+        if Broken.failing:
+            raise RuntimeError("broken bot")
+        return super().run(**kwargs)
+
+
+def make_bots() -> list:
+    bots = [Faller(team, limit=20 + 10 * i) for i, team in enumerate(TEAMS[:-1])]
+    return bots + [Broken(TEAMS[-1], limit=25)]
+
+
+@pytest.fixture
+def played(monkeypatch):
+    """
+    The teams and seed of every game played, in order.
+    """
+    labels = []
+    play_game = lunarlander.tournament._play_game
+
+    def record(task):
+        bots, seed, _, _ = task
+        labels.append((tuple(sorted(bot.team for bot in bots)), seed))
+        return play_game(task)
+
+    monkeypatch.setattr(lunarlander.tournament, "_play_game", record)
+    return labels
+
+
+def test_round_robin_schedule():
+    games = round_robin(TEAMS, heat_size=2, seeds=SEEDS, rounds=2, draw_seed=3)
+    assert len(games) == 2 * 2 * len(SEEDS)
+    assert games == round_robin(TEAMS, heat_size=2, seeds=SEEDS, rounds=2, draw_seed=3)
+    assert len({game.label for game in games}) == len(games)
+    for stage in ("round0", "round1"):
+        heats = {game.teams for game in games if game.stage == stage}
+        assert sorted(team for heat in heats for team in heat) == sorted(TEAMS)
+
+
+def test_resume_after_failed_games(tmp_path, monkeypatch, played):
+    games = round_robin(TEAMS, heat_size=2, seeds=SEEDS, rounds=2)
+    broken = [game for game in games if TEAMS[-1] in game.teams]
+
+    Broken.failing = True
+    try:
+        tournament = Tournament(make_bots(), store=str(tmp_path / "t.db"), processes=1)
+        with pytest.raises(RuntimeError, match=f"{len(broken)} games failed"):
+            tournament.play(games)
+    finally:
+        Broken.failing = False
+    assert len(played) == len(games)
+    for game in games:
+        assert tournament.store.has_round(game.label) == (game not in broken)
+    tournament.store.close()
+
+    # Running again only plays the games that failed
+    del played[:]
+    tournament = Tournament(make_bots(), store=str(tmp_path / "t.db"), processes=1)
+    tournament.play(games)
+    assert played == [(tuple(sorted(game.teams)), game.seed) for game in broken]
+    del played[:]
+    tournament.play(games)
+    assert played == []
+
+    # The results are the same as in a tournament that was not interrupted (in
+    # worker processes, which need the original function)
+    monkeypatch.undo()
+    again = Tournament(make_bots(), store=str(tmp_path / "again.db"), processes=2)
+    again.play(games)
+    assert tournament.scores(games) == again.scores(games)
+    assert tournament.store.totals() == again.store.totals()
+    assert tournament.store.leaderboard() == again.store.leaderboard()
+    tournament.store.close()
+    again.store.close()
+
+
+def test_resume_round_robin(tmp_path, played):
+    filename = str(tmp_path / "t.db")
+    ranking = Tournament(make_bots(), store=filename, processes=1).play_round_robin(
+        heat_size=2, seeds=SEEDS
+    )
+    assert sorted(team for team, _ in ranking) == sorted(TEAMS)
+    nplayed = len(played)
+    assert nplayed == 2 * len(SEEDS)
+    resumed = Tournament(make_bots(), store=filename, processes=1).play_round_robin(
+        heat_size=2, seeds=SEEDS
+    )
+    assert len(played) == nplayed
+    assert resumed == ranking
@@ -0,0 +1,181 @@
+# SPDX-License-Identifier: BSD-3-Clause
+
+import contextlib
+import io
+import time
+
+import numpy as np
+import pytest
+
+from lunarlander import Engine, Instructions, config
+from lunarlander.snapshot import Snapshot
+from lunarlander.workers import SharedWorld
+
+TEAMS = ["a", "b"]
+
+
+def make_snapshot(t: float, nasteroids: int, terrain_version: int = 0) -> Snapshot:
+    rng = np.random.RandomState(int(t))
+    return Snapshot(
+        t=t,
+        dt=0.1,
+        terrain=np.full(config.nx, float(terrain_version)),
+        terrain_version=terrain_version,
+        teams=TEAMS,
+        team_index={team: i for i, team in enumerate(TEAMS)},
+        position=rng.random_sample((2, 2)),
+        velocity=rng.random_sample((2, 2)),
+        heading=rng.random_sample(2),
+        fuel=rng.random_sample(2),
+        dead=np.array([False, True]),
+        landed=np.array([False, False]),
+        asteroid_ids=[str(i) for i in range(nasteroids)],
+        asteroid_position=rng.random_sample((nasteroids, 2)),
+        asteroid_velocity=rng.random_sample((nasteroids, 2)),
+        asteroid_heading=rng.random_sample(nasteroids),
+        asteroid_size=rng.random_sample(nasteroids),
+    )
+
+
+def assert_same(a: Snapshot, b: Snapshot):
+    assert (a.t, a.dt, a.terrain_version) == (b.t, b.dt, b.terrain_version)
+    assert a.asteroid_ids == b.asteroid_ids
+    for key in ("terrain", "position", "velocity", "heading", "fuel", "dead"):
+        np.testing.assert_array_equal(getattr(a, key), getattr(b, key))
+    np.testing.assert_array_equal(a.asteroid_position, b.asteroid_position)
+    np.testing.assert_array_equal(a.asteroid_size, b.asteroid_size)
+
+
+def test_slots_hold_separate_ticks():
+    world = SharedWorld(nplayers=2, capacity=4, nslots=2)
+    reader = SharedWorld(nplayers=2, capacity=4, nslots=2, name=world.name)
+    try:
+        first = make_snapshot(t=1.0, nasteroids=3)
+        world.write(first, slot=0)
+        seen = reader.read(TEAMS, slot=0)
+        # The next tick goes to the other slot, and does not change the first one
+        world.write(make_snapshot(t=2.0, nasteroids=1, terrain_version=1), slot=1)
+        assert_same(seen, first)
+        assert_same(reader.read(TEAMS, slot=1), make_snapshot(2.0, 1, 1))
+        # The arrays are read-only copies, which do not change with the slot
+        assert not seen.position.flags.writeable
+        world.write(make_snapshot(t=3.0, nasteroids=2), slot=0)
+        assert_same(seen, first)
+        assert seen.players["a"].position == tuple(first.position[0])
+    finally:
+        reader.close()
+        world.close()
+
+
+class Hover:
+    """
+    Bot that brakes when it falls too fast, and never turns.
+    """
+
+    def __init__(self, team: str):
+        self.team = team
+
+    def run(self, t, dt, terrain, players, asteroids):
+        instructions = Instructions()
+        instructions.main = players[self.team].velocity[1] < -10
+        return instructions
+
+
+def play(bot_workers: int) -> Engine:
+    with contextlib.redirect_stdout(io.StringIO()):
+        engine = Engine(
+            bots=[Hover(f"hover{i}") for i in range(3)],
+            seed=4,
+            headless=True,
+            write_scores=False,
+            bot_workers=bot_workers,
+        )
+        engine.run()
+    return engine
+
+
+@pytest.mark.parametrize("bot_workers", [1, 3])
+def test_workers_play_the_same_game(bot_workers):
+    expected = play(bot_workers=0)
+    engine = play(bot_workers=bot_workers)
+    for key in ("position", "velocity", "heading", "fuel", "dead", "landed"):
+        np.testing.assert_array_equal(
+            getattr(engine.landers, key), getattr(expected.landers, key), err_msg=key
+        )
+
+
+class Sleepy:
+    """
+    Bot that takes longer than the time budget every few ticks.
+    """
+
+    def __init__(self, team: str):
+        self.team = team
+
+    def run(self, t, dt, terrain, players, asteroids):
+        position = players[self.team].position
+        if int(t * 10) % 7 == 0:
+            time.sleep(0.02)
+        # The world does not change while the bot reads it
+        assert players[self.team].position == position
+        instructions = Instructions()
+        instructions.main = players[self.team].velocity[1] < -10
+        return instructions
+
+
+def test_late_workers_under_a_time_budget():
+    with contextlib.redirect_stdout(io.StringIO()):
+        engine = Engine(
+            bots=[Sleepy(f"sleepy{i}") for i in range(3)],
+            seed=2,
+            headless=True,
+            write_scores=False,
+            bot_workers=3,
+            bot_time_budget=0.005,
+        )
+        engine.run()
+    assert sum(hist.overruns for hist in engine.latency.values()) > 0
+    assert not engine.landers.active.any()
+
+
+class Keeper:
+    """
+    Bot that keeps the players and asteroids it was given, and raises an error if
+    they changed by the next tick. The error stops the game, also when the bot runs
+    in a worker.
+    """
+
+    def __init__(self, team: str):
+        self.team = team
+        self.previous = None
+
+    def run(self, t, dt, terrain, players, asteroids):
+        if self.previous is not None:
+            me, asteroids_before, saved = self.previous
+            now = (me.position, me.velocity, [a.position for a in asteroids_before])
+            if now != saved:
+                raise RuntimeError(f"The snapshot of t={t - dt} changed")
+        me = players[self.team]
+        self.previous = (
+            me,
+            asteroids,
+            (me.position, me.velocity, [a.position for a in asteroids]),
+        )
+        instructions = Instructions()
+        instructions.main = me.velocity[1] < -10
+        return instructions
+
+
+@pytest.mark.parametrize("workers", [0, 1, 2])
+def test_snapshots_kept_by_bots_do_not_change(workers):
+    with contextlib.redirect_stdout(io.StringIO()):
+        engine = Engine(
+            bots=[Keeper(f"keeper{i}") for i in range(3)],
+            seed=4,
+            headless=True,
+            write_scores=False,
+            bot_workers=workers,
+        )
+        engine.run()
+    assert engine.steps > 100
+    assert len(engine.asteroids) > 0